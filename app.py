@@ -1,14 +1,23 @@
 # app.py
-from flask import Flask, send_file, jsonify
-from learningESPN import fetch_and_save_nfl
+from flask import Flask, Response, render_template, request, send_file, jsonify
+from learningESPN import EXCEL_FILENAME, HTTP_SESSION, RUN_REPORT_PATH, fetch_and_save_nfl
+from export import FORMATS, MIMETYPES, export_path, read_json_rows, write_rows
+from espn_http import env_float
+from jobs import JobRunner, RefreshScheduler
+from leagues import LEAGUE
+from metrics import METRICS
+from game_metrics import GameMatrix
+from snapshots import SNAPSHOTS
+from warehouse import WAREHOUSE, parse_seasons
+import json
 import os
 from dotenv import load_dotenv  # pyright: ignore[reportMissingImports]
-import traceback
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
+# main.html sits next to this file and is rendered with the league's name.
+app = Flask(__name__, template_folder=".")
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Check if .env file exists and API key is loaded
@@ -23,30 +32,178 @@ else:
     print("⚠ Warning: .env file not found. Create one with OPENAI_API_KEY=your_key_here")
 @app.route('/')
 def home():
-    return send_file(os.path.join(BASE_DIR, "main.html"))
+    league_title = LEAGUE.name[:1].upper() + LEAGUE.name[1:]
+    return render_template("main.html", league=LEAGUE.name, league_title=league_title)
+
+def _run_pipeline(progress):
+    file_path = fetch_and_save_nfl(progress)
+    if not os.path.exists(file_path):
+        raise RuntimeError("File not created.")
+    return file_path
+
+
+job_runner = JobRunner(_run_pipeline)
+# Seconds after which the published snapshot is refreshed in the background (0: only on /run).
+REFRESH_INTERVAL = env_float("ESPN_REFRESH_INTERVAL", 3600.0)
+refresh_scheduler = RefreshScheduler(job_runner, REFRESH_INTERVAL, SNAPSHOTS.age_seconds)
+
+@app.before_request
+def start_refresh_scheduler():
+    # Started in the process that serves requests (after gunicorn forks its workers).
+    refresh_scheduler.start()
+
+def _refresh_status():
+    """
+    Start a refresh if the snapshot is stale and describe any run in flight.
+    """
+    refresh_scheduler.refresh_if_stale()
+    job = job_runner.latest()
+    refreshing = bool(job and not job.finished)
+    return {"refreshing": refreshing, "job_id": job.id if refreshing else None}
 
 @app.route('/run', methods=['POST'])
 def run():
+    # Clicks while a run is in flight join that run instead of starting another crawl.
+    job = job_runner.submit()
+    return jsonify({"status": job.state, "job_id": job.id}), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job."}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job."}), 404
+
+    def stream():
+        version = -1
+        while True:
+            new_version = job.wait_for_change(version, timeout=15)
+            if new_version == version:
+                # Keep idle connections open through proxies.
+                yield ": keepalive\n\n"
+                continue
+            version = new_version
+            yield f"data: {json.dumps(job.to_dict())}\n\n"
+            if job.finished:
+                return
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.route('/metrics')
+def metrics():
+    connections = HTTP_SESSION.connection_stats()
+    body = METRICS.render_prometheus(
+        extra_gauges={
+            "espn_connections_opened": connections["connections_opened"],
+            "espn_connections_reused": connections["connections_reused"],
+        }
+    )
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+@app.route('/report')
+def report():
+    # Prefer this process's last run; fall back to the report another worker wrote.
+    if METRICS.last_report is not None:
+        return jsonify(METRICS.last_report)
+    if os.path.exists(RUN_REPORT_PATH):
+        return send_file(os.path.abspath(RUN_REPORT_PATH), mimetype="application/json")
+    return jsonify({"status": "error", "message": "No run has finished yet."}), 404
+
+@app.route('/history')
+def history():
+    # Season totals from the warehouse, e.g. /history?seasons=2018-2024&team=KC. No ESPN requests.
     try:
-        file_path = fetch_and_save_nfl()
-        full_path = os.path.join(BASE_DIR, file_path)
-        if os.path.exists(full_path):
-            return jsonify({"status": "success", "message": "Analysis complete!"})
-        else:
-            return jsonify({"status": "error", "message": "File not created."}), 500
-    except Exception as e:
-        error_message = str(e)
-        # Include more details in debug mode
-        if app.debug:
-            error_message += f"\n\nTraceback:\n{traceback.format_exc()}"
-        print(f"Error in /run route: {error_message}")
-        return jsonify({"status": "error", "message": error_message}), 500
+        seasons = parse_seasons(request.args["seasons"]) if request.args.get("seasons") else None
+    except ValueError:
+        return jsonify({"status": "error", "message": "seasons must look like 2018-2024 or 2019,2021."}), 400
+    return jsonify({
+        "seasons": WAREHOUSE.seasons(),
+        "teams": WAREHOUSE.history(seasons, request.args.get("team")),
+    })
+
+@app.route('/history/games')
+def history_games():
+    # Per-game defensive rows for one season, e.g. /history/games?season=2023&team=12&week=5.
+    # With rolling=4, each row instead holds the team's averages over its last 4 games.
+    season = request.args.get("season", type=int)
+    if season is None:
+        return jsonify({"status": "error", "message": "season is required."}), 400
+    rolling = request.args.get("rolling", type=int)
+    if rolling:
+        matrix = GameMatrix.load(season, request.args.get("season_type", 2, type=int), WAREHOUSE)
+        team, week = request.args.get("team"), request.args.get("week", type=int)
+        return jsonify([
+            row for row in matrix.rolling(rolling)
+            if (team is None or row["team_id"] == team) and (week is None or row["week"] == week)
+        ])
+    return jsonify(WAREHOUSE.games(
+        season,
+        team=request.args.get("team"),
+        week=request.args.get("week", type=int),
+        season_type=request.args.get("season_type", type=int),
+    ))
+
+@app.route('/data')
+def data():
+    # The current snapshot's rows, served right away even while a refresh is running.
+    status = _refresh_status()
+    snapshot = SNAPSHOTS.current()
+    if snapshot is None:
+        message = "No results yet. The first run is in progress." if status["refreshing"] else "No results yet. Start a run first."
+        return jsonify({"status": "pending", "message": message, **status}), 503
+    response = jsonify({
+        "snapshot": snapshot,
+        "age_seconds": round(SNAPSHOTS.age_seconds() or 0, 1),
+        **status,
+        "rows": SNAPSHOTS.rows(snapshot),
+    })
+    response.set_etag(f"{snapshot['version']}-{int(status['refreshing'])}")
+    return response.make_conditional(request)
+
+@app.route('/snapshots')
+def snapshots():
+    current = SNAPSHOTS.current()
+    return jsonify({"current": current["version"] if current else None, "snapshots": SNAPSHOTS.list()})
+
+def _export_file(fmt):
+    """
+    Path of the latest results in `fmt`: the current snapshot's export, or for results
+    written before snapshots existed, the working-directory export (converted from the
+    JSON export when that format wasn't written by the run or is older than the JSON).
+    """
+    snapshot = SNAPSHOTS.current()
+    if snapshot is not None:
+        return SNAPSHOTS.file(snapshot, fmt)
+    file_path = export_path(os.path.join(BASE_DIR, EXCEL_FILENAME), fmt)
+    json_path = export_path(file_path, "json")
+    stale = os.path.exists(json_path) and (
+        not os.path.exists(file_path) or os.path.getmtime(file_path) < os.path.getmtime(json_path)
+    )
+    if fmt != "json" and stale:
+        write_rows(read_json_rows(json_path), file_path, fmt)
+    return file_path
 
 @app.route('/download')
 def download():
-    file_path = os.path.join(BASE_DIR, "nfl_ai_summary.xlsx")
+    fmt = request.args.get("format", "xlsx").lower()
+    if fmt not in FORMATS:
+        return jsonify({"status": "error", "message": f"Unknown format. Choose one of: {', '.join(FORMATS)}."}), 400
+    _refresh_status()
+    try:
+        file_path = _export_file(fmt)
+    except RuntimeError as e:
+        return jsonify({"status": "error", "message": str(e)}), 501
     if os.path.exists(file_path):
-        return send_file(file_path, as_attachment=True, download_name="nfl_ai_summary.xlsx")
+        # Absolute, since send_file resolves relative paths against the app folder, not the working directory.
+        return send_file(
+            os.path.abspath(file_path), mimetype=MIMETYPES[fmt], as_attachment=True, download_name=os.path.basename(file_path)
+        )
     else:
         return jsonify({"status": "error", "message": "File not found. Make sure you clicked Start first."}), 404
 
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Compare AI summary modes: one request per team vs several teams per request.
+
+Reports requests, tokens and wall time for each mode over 32 synthetic teams. The
+summary cache is bypassed so every mode hits the API. Point OPENAI_BASE_URL at a
+local stub to run without spending tokens.
+
+    python benchmarks/bench_ai_modes.py 1 4 8
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import learningESPN  # noqa: E402
+from season_state import SummaryCache  # noqa: E402
+
+
+def sample_teams(count: int = 32):
+    return [
+        {
+            "Team": f"Team {idx}",
+            "Abbreviation": f"T{idx}",
+            "Team_ID": str(idx),
+            "Points_Allowed": 250 + idx * 7,
+            "Yards_Allowed": 4800 + idx * 61,
+            "Turnovers": 10 + idx % 13,
+            "Sacks": 25 + idx % 17,
+            "Interceptions": 5 + idx % 11,
+        }
+        for idx in range(1, count + 1)
+    ]
+
+
+def main(batch_sizes):
+    print(f"{'mode':<10}{'batch':>7}{'requests':>10}{'tokens':>10}{'fallback':>10}{'seconds':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for batch_size in batch_sizes:
+            learningESPN.SUMMARY_CACHE = SummaryCache(os.path.join(tmp, f"summaries_{batch_size}.json"))
+            report = learningESPN.generate_ai_summaries(sample_teams(), batch_size=batch_size)
+            print(
+                f"{report['mode']:<10}{batch_size:>7}{report['requests']:>10}{report['total_tokens']:>10}"
+                f"{report['fallback_teams']:>10}{report['wall_seconds']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 8])
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Compare parsing /summary payloads in full (json.loads + trim) against the streaming
+partial parser in boxscore_parser.py.
+
+Reports time per payload and peak traced memory per parse for each path over a
+corpus of recorded payloads (*.json or *.json.gz files, or directories of them).
+With no arguments a synthetic payload padded to the size of a real summary is used.
+The streaming parser's gain is peak memory (about a fifth of json.loads on the
+synthetic payload); it is no faster per payload, and often slower.
+
+    python benchmarks/bench_boxscore_parse.py recordings/
+"""
+import gzip
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from boxscore_parser import parse_summary_stream, trim_summary  # noqa: E402
+
+
+def load_corpus(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names) if ".json" in name)
+        else:
+            files.append(path)
+
+    corpus = []
+    for file_path in files:
+        opener = gzip.open if file_path.endswith(".gz") else open
+        with opener(file_path, "rb") as f:
+            corpus.append(f.read())
+    return corpus
+
+
+def synthetic_payload() -> bytes:
+    team_stats = [{"name": f"stat{i}", "displayValue": str(i * 3), "value": i * 3} for i in range(25)]
+    team_stats.append({"name": "totalYards", "displayValue": "351", "value": 351})
+    payload = {
+        "boxscore": {
+            "teams": [{"team": {"id": str(tid)}, "statistics": team_stats} for tid in (1, 2)],
+            "players": [{"athletes": [{"id": i, "stats": ["1"] * 12} for i in range(60)]}] * 2,
+        },
+        "drives": {"previous": [{"plays": [{"text": "x" * 200, "id": i} for i in range(12)]} for _ in range(24)]},
+        "plays": [{"text": "y" * 200, "clock": {"displayValue": "1:00"}} for _ in range(180)],
+        "news": {"articles": [{"headline": "z" * 120, "story": "w" * 2000} for _ in range(8)]},
+        "header": {"competitions": [{"status": {"type": {"completed": True}}, "competitors": [{"id": "1", "score": "24"}, {"id": "2", "score": "17"}]}]},
+    }
+    return json.dumps(payload).encode("utf-8")
+
+
+def run(label, parse, corpus):
+    start = time.perf_counter()
+    results = [parse(body) for body in corpus]
+    elapsed = time.perf_counter() - start
+
+    # Peak memory of parsing one payload at a time, excluding the kept results.
+    peak = 0
+    tracemalloc.start()
+    for body in corpus:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        parse(body)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    per_payload_ms = elapsed / len(corpus) * 1000
+    print(f"{label:<12}{per_payload_ms:>14.2f}{peak / 1024:>14.0f}")
+    return results
+
+
+def main(paths):
+    corpus = load_corpus(paths) if paths else [synthetic_payload()] * 50
+    if not corpus:
+        print("No payloads found.")
+        return 1
+    average_kb = sum(len(body) for body in corpus) / len(corpus) / 1024
+    print(f"{len(corpus)} payloads, {average_kb:.0f} KB average")
+    print(f"{'parser':<12}{'ms/payload':>14}{'peak KiB':>14}")
+    full = run("json.loads", lambda body: trim_summary(json.loads(body)), corpus)
+    streamed = run("streaming", lambda body: parse_summary_stream(io.BytesIO(body)), corpus)
+    if full != streamed:
+        print("WARNING: parsers disagree on at least one payload.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
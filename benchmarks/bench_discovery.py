@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Compare event discovery strategies: per-team schedule crawl vs weekly league scoreboard.
+
+Reports requests issued and wall time for each strategy and checks both find the same
+completed games. Runs against live ESPN unless ESPN_SITE_API_BASE points elsewhere.
+
+    ESPN_CACHE=0 python benchmarks/bench_discovery.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import learningESPN  # noqa: E402
+
+
+def main():
+    season = learningESPN._get_regular_season_year()
+    team_ids = [team.id for team in learningESPN._get_team_list()]
+
+    request_count = {"n": 0}
+    make_request = learningESPN._make_request
+
+    def counting_request(*args, **kwargs):
+        request_count["n"] += 1
+        return make_request(*args, **kwargs)
+
+    learningESPN._make_request = counting_request
+
+    results = {}
+    print(f"Season {season}, {len(team_ids)} teams")
+    print(f"{'strategy':<12}{'requests':>10}{'events':>10}{'final':>10}{'seconds':>10}")
+    for strategy in ("schedule", "scoreboard"):
+        request_count["n"] = 0
+        start = time.perf_counter()
+        event_index = learningESPN._build_event_index(team_ids, season, strategy=strategy)
+        elapsed = time.perf_counter() - start
+        completed = {event_id for event_id, info in event_index.items() if info.completed}
+        results[strategy] = completed
+        print(f"{strategy:<12}{request_count['n']:>10}{len(event_index):>10}{len(completed):>10}{elapsed:>10.2f}")
+
+    if results["schedule"] != results["scoreboard"]:
+        missing = results["schedule"] ^ results["scoreboard"]
+        print(f"WARNING: strategies disagree on {len(missing)} completed events: {sorted(missing)[:10]}")
+        return 1
+    print("Both strategies found the same completed events.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
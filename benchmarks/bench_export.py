@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Compare the pandas + openpyxl `to_excel` path against the streaming exporters in
+export.py on per-game-level output.
+
+Each writer runs in its own subprocess so peak RSS includes import cost (pandas is
+only imported by the baseline). Parquet is skipped when pyarrow isn't installed.
+
+    python benchmarks/bench_export.py --rows 50000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD_SCRIPT = """
+import json, resource, sys, time
+sys.path.insert(0, {repo!r})
+sys.path.insert(0, {bench_dir!r})
+from bench_export import make_rows
+rows = make_rows({rows})
+start = time.perf_counter()
+if {writer!r} == "pandas_to_excel":
+    import pandas as pd
+    pd.DataFrame(rows).to_excel({path!r}, index=False, engine="openpyxl")
+else:
+    from export import write_rows
+    write_rows(rows, {path!r}, {writer!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+
+def make_rows(count: int):
+    """
+    Per-game defensive rows shaped like a multi-season export.
+    """
+    rng = random.Random(11)
+    return [
+        {
+            "Season": 2015 + idx // 5440,
+            "Week": 1 + (idx // 32) % 18,
+            "Event_ID": str(401000000 + idx // 2),
+            "Team": f"Team {idx % 32}",
+            "Abbreviation": f"T{idx % 32}",
+            "Team_ID": str(idx % 32 + 1),
+            "Points_Allowed": rng.randint(0, 45),
+            "Yards_Allowed": rng.randint(180, 520),
+            "Passing_Yards_Allowed": rng.randint(100, 400),
+            "Rushing_Yards_Allowed": rng.randint(30, 220),
+            "Turnovers": rng.randint(0, 5),
+            "Sacks": rng.randint(0, 8),
+            "Interceptions": rng.randint(0, 4),
+            "AI_Summary": "Solid coverage and a disruptive pass rush kept the offense in check. " * 2,
+        }
+        for idx in range(count)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark export writers.")
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    writers = ["pandas_to_excel", "xlsx", "csv", "json", "parquet"]
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        writers.remove("parquet")
+
+    print(f"{args.rows} rows")
+    print(f"{'writer':<18}{'seconds':>10}{'peak RSS MB':>14}{'file MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for writer in writers:
+            extension = "xlsx" if writer == "pandas_to_excel" else writer
+            path = os.path.join(tmp, f"{writer}.{extension}")
+            script = CHILD_SCRIPT.format(repo=REPO_DIR, bench_dir=os.path.dirname(os.path.abspath(__file__)),
+                                         rows=args.rows, writer=writer, path=path)
+            output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"{writer:<18}{result['seconds']:>10.2f}{result['peak_rss_mb']:>14.1f}{size_mb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
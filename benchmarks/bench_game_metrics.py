@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Compare the vectorized season and rolling metrics in game_metrics.py against the
+same numbers computed with per-team Python loops, on synthetic seasons loaded into
+a temporary warehouse. Both paths must agree.
+
+    python benchmarks/bench_game_metrics.py --seasons 10 --window 4
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_metrics import COLUMNS, GameMatrix  # noqa: E402
+from records import TeamGame  # noqa: E402
+from warehouse import REGULAR_SEASON, StatsWarehouse  # noqa: E402
+
+
+def fill_warehouse(warehouse: StatsWarehouse, seasons: int, teams: int = 32, weeks: int = 18) -> None:
+    rng = random.Random(5)
+    team_ids = [str(i) for i in range(1, teams + 1)]
+    for season in range(2024 - seasons + 1, 2025):
+        games, rows = [], []
+        for week in range(1, weeks + 1):
+            order = team_ids[:]
+            rng.shuffle(order)
+            for home, away in zip(order[0::2], order[1::2]):
+                event_id = f"{season}{week:02d}{home}{away}"
+                boxscore = [
+                    {"team": {"id": tid}, "statistics": [
+                        {"name": "totalYards", "displayValue": f"{rng.randint(180, 520):,}"},
+                        {"name": "netPassingYards", "displayValue": str(rng.randint(100, 380))},
+                        {"name": "rushingYards", "displayValue": str(rng.randint(-5, 220))},
+                        {"name": "turnovers", "displayValue": str(rng.randint(0, 4))},
+                        {"name": "interceptions", "displayValue": str(rng.randint(0, 3))},
+                        {"name": "sacksYardsLost", "displayValue": f"{rng.randint(0, 6)}-{rng.randint(0, 45)}"},
+                        {"name": "thirdDownEff", "displayValue": f"{rng.randint(2, 9)}-{rng.randint(10, 16)}"},
+                        {"name": "redZoneAttempts", "displayValue": f"{rng.randint(0, 3)}-{rng.randint(3, 5)}"},
+                    ]}
+                    for tid in (home, away)
+                ]
+                games.append({"event_id": event_id, "season": season, "season_type": REGULAR_SEASON,
+                              "week": week, "boxscore": boxscore})
+                for team_id, opponent_id in ((home, away), (away, home)):
+                    rows.append(TeamGame(event_id, team_id, opponent_id, season, REGULAR_SEASON, week,
+                                         points_allowed=rng.randint(0, 45)))
+        warehouse.put_games(games, rows)
+
+
+def loop_metrics(matrix: GameMatrix, window: int):
+    """
+    Per-team season totals, recent averages and rolling averages of every column with
+    plain loops.
+    """
+    games_by_team = {}
+    for idx, team_id in enumerate(matrix.team_ids.tolist()):
+        games_by_team.setdefault(team_id, []).append((int(matrix.weeks[idx]), matrix.values[idx].tolist()))
+    season, rolling = {}, {}
+    for team_id, games in games_by_team.items():
+        games.sort(key=lambda game: game[0])
+        recent = games[-window:]
+        season[team_id] = {
+            name: sum(game[1][col] for game in games) for col, name in enumerate(COLUMNS)
+        }
+        season[team_id].update({
+            f"recent_{name}_per_game": sum(game[1][col] for game in recent) / len(recent)
+            for col, name in enumerate(COLUMNS)
+        })
+        for idx in range(len(games)):
+            chunk = games[max(0, idx - window + 1):idx + 1]
+            rolling[(team_id, games[idx][0])] = {
+                f"{name}_avg": sum(game[1][col] for game in chunk) / len(chunk) for col, name in enumerate(COLUMNS)
+            }
+    return season, rolling
+
+
+def timed(func, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark vectorized game metrics.")
+    parser.add_argument("--seasons", type=int, default=10)
+    parser.add_argument("--window", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        warehouse = StatsWarehouse(os.path.join(tmp, "warehouse.sqlite"))
+        fill_warehouse(warehouse, args.seasons)
+        seasons = range(2024 - args.seasons + 1, 2025)
+
+        matrices, load_seconds = timed(lambda: [GameMatrix.load(s, warehouse=warehouse) for s in seasons], 1)
+        rows = sum(len(matrix) for matrix in matrices)
+        season_only, season_seconds = timed(lambda: [m.season_metrics(args.window) for m in matrices], args.repeat)
+        vectorized, vector_seconds = timed(
+            lambda: [(m.season_metrics(args.window), m.rolling(args.window)) for m in matrices], args.repeat
+        )
+        looped, loop_seconds = timed(lambda: [loop_metrics(m, args.window) for m in matrices], args.repeat)
+
+    for (season_metrics, rolling), (loop_season, loop_rolling) in zip(vectorized, looped):
+        for team_id, expected in loop_season.items():
+            assert season_metrics[team_id]["points_allowed"] == expected["points_allowed"]
+            assert abs(season_metrics[team_id]["recent_points_allowed_per_game"]
+                       - expected["recent_points_allowed_per_game"]) < 0.051
+        for row in rolling:
+            expected = loop_rolling[(row["team_id"], row["week"])]
+            assert all(abs(row[name] - value) < 0.006 for name, value in expected.items())
+
+    print(f"{args.seasons} seasons, {rows} team-game rows, window {args.window}")
+    print(f"{'matrix load':<24}{load_seconds * 1000:>10.1f} ms")
+    print(f"{'season metrics':<24}{season_seconds * 1000:>10.1f} ms")
+    print(f"{'season + rolling':<24}{vector_seconds * 1000:>10.1f} ms")
+    print(f"{'per-team loops':<24}{loop_seconds * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Measure with tracemalloc the memory a multi-season per-game dataset takes as the
+pipeline's compact records (records.py, interned ids, coded GameMatrix arrays) and
+as the dicts and object arrays they replaced: the event index built from scoreboard
+payloads, the per-team game rows built from boxscores, and the game matrices loaded
+from a warehouse. Payloads are parsed inside each measurement and dropped as the
+pipeline drops them, so "retained" is what the result keeps alive. Both
+representations must hold the same values.
+
+    python benchmarks/bench_memory.py --seasons 10
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_game_metrics import fill_warehouse  # noqa: E402
+from game_metrics import COLUMNS, DEFENSE_COLUMNS, GameMatrix, parse_boxscore_teams  # noqa: E402
+from learningESPN import _competitor_score, _game_rows, _index_events  # noqa: E402
+from warehouse import REGULAR_SEASON, StatsWarehouse  # noqa: E402
+
+
+def legacy_index_events(payloads: List[Dict]) -> Dict[str, Dict]:
+    """
+    The event index learningESPN.py built before records.Event: one dict per event.
+    """
+    event_index = {}
+    for payload in payloads:
+        payload_week = (payload.get("week") or {}).get("number")
+        for event in payload.get("events", []):
+            competitions = event.get("competitions", [])
+            if not competitions:
+                continue
+            competitors = [c for c in competitions[0].get("competitors", []) if c.get("team")]
+            status = competitions[0].get("status") or event.get("status") or {}
+            event_index[event.get("id")] = {
+                "teams": [c["team"].get("id") for c in competitors],
+                "completed": bool(status.get("type", {}).get("completed")),
+                "week": (event.get("week") or {}).get("number", payload_week),
+                "date": event.get("date"),
+                "scores": {c["team"].get("id"): _competitor_score(c) for c in competitors},
+            }
+    return event_index
+
+
+def legacy_game_rows(event_id: str, info: Dict, season: int, summary_payload: Dict) -> List[Dict]:
+    """
+    The per-team game rows learningESPN.py built before records.TeamGame.
+    """
+    gained = parse_boxscore_teams(summary_payload.get("boxscore", {}).get("teams", []))
+    rows = []
+    for team_id, opponent_id in (list(gained), list(gained)[::-1]):
+        opponent = gained[opponent_id]
+        rows.append({
+            "event_id": event_id, "team_id": team_id, "opponent_id": opponent_id, "season": season,
+            "season_type": REGULAR_SEASON, "week": info.get("week"),
+            "points_allowed": info.get("scores", {}).get(opponent_id), "yards_allowed": opponent["yards"],
+            "passing_yards_allowed": opponent["passing_yards"], "rushing_yards_allowed": opponent["rushing_yards"],
+            "takeaways": opponent["turnovers"], "sacks": opponent["sacked"],
+            "interceptions": opponent["interceptions_thrown"],
+        })
+    return rows
+
+
+def legacy_matrix(season: int, warehouse: StatsWarehouse):
+    """
+    The arrays GameMatrix.load built before team and event codes: object arrays of ids
+    and float64 values, from a list of every row and boxscore of the season.
+    """
+    import numpy as np
+
+    points = {(row["event_id"], row["team_id"]): row["points_allowed"] for row in warehouse.games(season)}
+    games = list(warehouse.boxscores(season))
+    values = np.zeros((2 * len(games), len(COLUMNS)), dtype=np.float64)
+    team_ids, opponent_ids, event_ids, weeks = [], [], [], []
+    row = 0
+    for game in games:
+        parsed = parse_boxscore_teams(game["teams"])
+        first, second = parsed
+        for team_id, opponent_id in ((first, second), (second, first)):
+            values[row, 0] = points.get((game["event_id"], team_id)) or 0
+            values[row, 1:] = [parsed[opponent_id][key] for key in DEFENSE_COLUMNS.values()]
+            team_ids.append(team_id)
+            opponent_ids.append(opponent_id)
+            event_ids.append(game["event_id"])
+            weeks.append(game["week"] or 0)
+            row += 1
+    return (np.array(team_ids, dtype=object), np.array(opponent_ids, dtype=object),
+            np.array(event_ids, dtype=object), np.array(weeks, dtype=np.int64), values[:row])
+
+
+def scoreboard_payloads(warehouse: StatsWarehouse, seasons: range) -> List[bytes]:
+    """
+    One scoreboard payload per stored week, as the JSON bytes ESPN would send.
+    """
+    rng = random.Random(11)
+    weeks: Dict[tuple, List[Dict]] = {}
+    for season in seasons:
+        for game in warehouse.boxscores(season):
+            weeks.setdefault((season, game["week"]), []).append({
+                "id": game["event_id"],
+                "date": f"{season}-09-07T00:20Z",
+                "week": {"number": game["week"]},
+                "competitions": [{
+                    "status": {"type": {"completed": True}},
+                    "competitors": [
+                        {"team": {"id": team["team"]["id"]}, "score": str(rng.randint(0, 45))}
+                        for team in game["teams"]
+                    ],
+                }],
+            })
+    return [json.dumps({"week": {"number": week}, "events": events}).encode() for (_, week), events in weeks.items()]
+
+
+def measure(func):
+    """
+    Run `func` under tracemalloc. Returns its result with the bytes it still holds and
+    the peak bytes allocated while it ran.
+    """
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    result = func()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current - base, peak - base
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark memory of per-game records.")
+    parser.add_argument("--seasons", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        warehouse = StatsWarehouse(os.path.join(tmp, "warehouse.sqlite"))
+        fill_warehouse(warehouse, args.seasons)
+        seasons = range(2024 - args.seasons + 1, 2025)
+        payloads = scoreboard_payloads(warehouse, seasons)
+        summaries = [
+            (season, game["event_id"], json.dumps({"boxscore": {"teams": game["teams"]}}).encode())
+            for season in seasons for game in warehouse.boxscores(season)
+        ]
+
+        def index_weeks(index_events):
+            # One scoreboard at a time, as the pipeline parses them.
+            event_index = {}
+            for payload in payloads:
+                event_index.update(index_events([json.loads(payload)]))
+            return event_index
+
+        legacy_events = index_weeks(legacy_index_events)
+        events = index_weeks(_index_events)
+
+        cases = [
+            (
+                "event index",
+                lambda: index_weeks(legacy_index_events),
+                lambda: index_weeks(_index_events),
+                lambda legacy, compact: all(
+                    compact[event_id].teams == tuple(info["teams"])
+                    and compact[event_id].scores == tuple(info["scores"].values())
+                    for event_id, info in legacy.items()
+                ),
+            ),
+            (
+                "game rows",
+                lambda: [
+                    row for season, event_id, body in summaries
+                    for row in legacy_game_rows(event_id, legacy_events[event_id], season, json.loads(body))
+                ],
+                lambda: [
+                    row for season, event_id, body in summaries
+                    for row in _game_rows(event_id, events[event_id], season, REGULAR_SEASON, json.loads(body))
+                ],
+                lambda legacy, compact: [row._asdict() for row in compact] == legacy,
+            ),
+            (
+                "game matrices",
+                lambda: [legacy_matrix(season, warehouse) for season in seasons],
+                lambda: [GameMatrix.load(season, warehouse=warehouse) for season in seasons],
+                lambda legacy, compact: all(
+                    old[0].tolist() == new.team_ids.tolist() and old[2].tolist() == new.event_ids.tolist()
+                    and (old[4] == new.values).all()
+                    for old, new in zip(legacy, compact)
+                ),
+            ),
+        ]
+
+        print(f"{args.seasons} seasons, {len(events)} games, {2 * len(events)} team-game rows")
+        print(f"{'':<16}{'legacy retained':>16}{'compact retained':>18}{'legacy peak':>13}{'compact peak':>14}")
+        for label, legacy_func, compact_func, same in cases:
+            legacy, legacy_kept, legacy_peak = measure(legacy_func)
+            compact, compact_kept, compact_peak = measure(compact_func)
+            assert same(legacy, compact), label
+            del legacy, compact
+            print(
+                f"{label:<16}{legacy_kept / 2**20:>13.2f} MB{compact_kept / 2**20:>15.2f} MB"
+                f"{legacy_peak / 2**20:>10.2f} MB{compact_peak / 2**20:>11.2f} MB"
+                f"  ({legacy_kept / compact_kept:.1f}x smaller)"
+            )
+
+
+if __name__ == "__main__":
+    main()
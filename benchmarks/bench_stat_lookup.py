@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Compare reading N stats from ESPN season statistics payloads with the old nested scan
+(one walk of the categories per stat) against stat_index.py (index_stats per payload,
+then select_stats). Uses the statistics payloads in a fixture directory when given,
+plus synthetic payloads shaped like ESPN's (about ten categories of 30-50 stats).
+Both paths must agree.
+
+    python benchmarks/bench_stat_lookup.py --fixtures /tmp/espn-fixtures --fields 4,16,64,128,256
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import FixtureStore  # noqa: E402
+from stat_index import index_stats, select_stats  # noqa: E402
+
+CATEGORIES = (
+    "general", "passing", "rushing", "receiving", "defensive",
+    "defensiveInterceptions", "kicking", "returning", "punting", "miscellaneous", "scoring",
+)
+
+
+def legacy_extract_stat(categories: List[Dict], category_name: str, stat_name: str, default: float = 0.0) -> float:
+    """
+    The category scan learningESPN.py used before stat_index.py.
+    """
+    for category in categories:
+        if category.get("name") == category_name:
+            for stat in category.get("stats", []):
+                if stat.get("name") == stat_name:
+                    value = stat.get("value")
+                    if value in (None, "", "null"):
+                        return default
+                    try:
+                        return float(value)
+                    except (ValueError, TypeError):
+                        try:
+                            return float(stat.get("displayValue", default).replace(",", ""))
+                        except Exception:
+                            return default
+    return default
+
+
+def synthetic_payload(rng: random.Random) -> Dict:
+    categories = []
+    for name in CATEGORIES:
+        stats = []
+        for idx in range(rng.randint(30, 50)):
+            value = round(rng.uniform(0, 5000), 1)
+            stat = {"name": f"{name}Stat{idx}", "value": value, "displayValue": f"{value:,}"}
+            if rng.random() < 0.1:
+                stat["value"] = "--"
+            stats.append(stat)
+        categories.append({"name": name, "stats": stats})
+    return {"splits": {"categories": categories}}
+
+
+def recorded_payloads(directory: str) -> List[Dict]:
+    store = FixtureStore(directory)
+    payloads = []
+    for key in store.index:
+        if key.startswith("core/") and "/statistics?" in key:
+            status, body = store.get(key)
+            if status == 200:
+                payloads.append(json.loads(body))
+    return payloads
+
+
+def payload_fields(payloads: List[Dict]) -> List[tuple]:
+    """
+    Every (category, stat) present in the payloads, in first-seen order.
+    """
+    fields = {}
+    for payload in payloads:
+        for category in payload.get("splits", {}).get("categories", []):
+            for stat in category.get("stats", []):
+                fields.setdefault((category.get("name"), stat.get("name")), None)
+    return list(fields)
+
+
+def timed(func, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark season stat lookups.")
+    parser.add_argument("--fixtures", help="Fixture directory with recorded statistics payloads")
+    parser.add_argument("--synthetic", type=int, default=320, help="Synthetic payloads (10 seasons x 32 teams)")
+    parser.add_argument("--fields", default="4,16,64,128,256", help="Comma-separated numbers of stats to read")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(7)
+    datasets = []
+    if args.fixtures:
+        datasets.append(("recorded", recorded_payloads(args.fixtures)))
+    datasets.append(("synthetic", [synthetic_payload(rng) for _ in range(args.synthetic)]))
+
+    for label, payloads in datasets:
+        if not payloads:
+            print(f"{label}: no statistics payloads")
+            continue
+        fields = payload_fields(payloads)
+        rng.shuffle(fields)
+        print(f"{label}: {len(payloads)} payloads, {len(fields)} distinct stats")
+        for count in sorted({min(int(n), len(fields)) for n in args.fields.split(",")}):
+            schema = {f"{group}.{name}": ("statistics", group, name) for group, name in fields[:count]}
+
+            def scan():
+                return [
+                    {
+                        column: legacy_extract_stat(payload["splits"]["categories"], group, name)
+                        for column, (_, group, name) in schema.items()
+                    }
+                    for payload in payloads
+                ]
+
+            def indexed():
+                return [select_stats({"statistics": index_stats(payload)}, schema) for payload in payloads]
+
+            expected, scan_seconds = timed(scan, args.repeat)
+            actual, index_seconds = timed(indexed, args.repeat)
+            assert actual == expected
+            print(
+                f"  {count:>4} stats  scan {scan_seconds * 1000:>9.2f} ms  "
+                f"index {index_seconds * 1000:>9.2f} ms  ({scan_seconds / index_seconds:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Fail if importing the web app or the CLI module takes longer than its budget.
+
+Each module is imported in a fresh interpreter under `python -X importtime` and the
+cumulative time reported for it is compared against the budget. The best of a few
+runs is used to keep the check stable on a busy machine.
+
+    python benchmarks/check_import_time.py
+    python benchmarks/check_import_time.py --budget learningESPN=150 --runs 5
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Milliseconds. Flask itself accounts for most of the app budget.
+BUDGETS_MS = {
+    "learningESPN": 200,
+    "app": 300,
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def import_time_ms(module: str) -> tuple:
+    """
+    Cumulative import time of `module` in milliseconds, plus the slowest modules it
+    pulled in directly.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    )
+    total = None
+    children = []
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent == 1:
+            # Children are reported before their parent; keep only this module's.
+            if name == module:
+                total = cumulative / 1000
+                break
+            children = []
+        elif indent == 3:
+            children.append((cumulative / 1000, name))
+    if total is None:
+        raise RuntimeError(f"No import time reported for {module}")
+    return total, sorted(children, reverse=True)[:5]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time budget check.")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=MS",
+                        help="override a module's budget (repeatable)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    budgets = dict(BUDGETS_MS)
+    for item in args.budget:
+        module, _, ms = item.partition("=")
+        budgets[module] = float(ms)
+
+    failures = 0
+    for module, budget in budgets.items():
+        results = [import_time_ms(module) for _ in range(max(args.runs, 1))]
+        total, children = min(results)
+        status = "ok" if total <= budget else "OVER BUDGET"
+        failures += total > budget
+        slowest = ", ".join(f"{name} {ms:.0f}ms" for ms, name in children)
+        print(f"{module:<14}{total:>8.1f} ms  (budget {budget:.0f} ms)  {status}  [{slowest}]")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for ESPN (and OpenAI) used by the offline benchmarks.
+
+Fixtures are a directory of recorded responses:
+
+    <dir>/manifest.json                 season and how the fixtures were made
+    <dir>/index.json                    request key -> status and body file
+    <dir>/responses/<endpoint>-<hash>.json.gz
+
+The server exposes ESPN's two API bases under /site and /core, so the pipeline runs
+against it with
+
+    ESPN_SITE_API_BASE=http://127.0.0.1:<port>/site
+    ESPN_CORE_API_BASE=http://127.0.0.1:<port>/core
+    OPENAI_BASE_URL=http://127.0.0.1:<port>/openai/v1
+
+Chat completions are answered with deterministic canned summaries. Latency and error
+rates can be injected to exercise retries and concurrency. Subcommands:
+
+    record <dir> --season 2024   proxy live ESPN once and save every response
+    generate <dir>               write a synthetic 32-team season (no network needed)
+    serve <dir>                  replay fixtures
+
+Fixtures are for one league (--league, see leagues.py); the server's env() selects it
+with ESPN_LEAGUE. `generate --league ncaaf --teams 134` makes an FBS-sized season.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from leagues import POSTSEASON, REGULAR_SEASON, get_league  # noqa: E402
+
+
+def request_key(path: str, query: str) -> str:
+    """
+    Normalize a request to "<path>?<sorted query>" so parameter order doesn't matter.
+    """
+    pairs = sorted(parse_qsl(query, keep_blank_values=True))
+    return f"{path.strip('/')}?{urlencode(pairs)}" if pairs else path.strip("/")
+
+
+def _endpoint(key: str) -> str:
+    segments = [s for s in key.split("?")[0].split("/") if s and not s.isdigit()]
+    return segments[-1] if segments else "root"
+
+
+class FixtureStore:
+    """
+    Recorded responses on disk, loaded into memory for serving.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index: Dict[str, Dict] = {}
+        self.manifest: Dict = {}
+        self._bodies: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        index_path = os.path.join(directory, "index.json")
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                self.index = json.load(f)
+        manifest_path = os.path.join(directory, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def get(self, key: str) -> Optional[Tuple[int, bytes]]:
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        body = self._bodies.get(key)
+        if body is None:
+            with gzip.open(os.path.join(self.directory, entry["file"]), "rb") as f:
+                body = f.read()
+            self._bodies[key] = body
+        return entry["status"], body
+
+    def put(self, key: str, status: int, body: bytes) -> None:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        file_name = os.path.join("responses", f"{_endpoint(key)}-{digest}.json.gz")
+        os.makedirs(os.path.join(self.directory, "responses"), exist_ok=True)
+        with gzip.open(os.path.join(self.directory, file_name), "wb") as f:
+            f.write(body)
+        with self._lock:
+            self.index[key] = {"status": status, "file": file_name}
+            self._bodies[key] = body
+
+    def save(self, **manifest) -> None:
+        self.manifest.update(manifest)
+        with open(os.path.join(self.directory, "index.json"), "w") as f:
+            json.dump(self.index, f, indent=0, sort_keys=True)
+        with open(os.path.join(self.directory, "manifest.json"), "w") as f:
+            json.dump(self.manifest, f, indent=2)
+
+
+def _canned_chat_completion(request: Dict) -> Dict:
+    """
+    Deterministic stand-in for a chat completion, including the batched JSON mode.
+    """
+    prompt = request["messages"][-1]["content"]
+    if request.get("response_format", {}).get("type") == "json_object":
+        teams = json.loads(prompt.split("Teams:\n", 1)[1])
+        content = json.dumps(
+            {"summaries": [{"team_id": t["team_id"], "summary": f"{t['team']} defense summary."} for t in teams]}
+        )
+    else:
+        match = re.search(r"^Team: (.*)$", prompt, re.MULTILINE)
+        content = f"{match.group(1) if match else 'Team'} defense summary."
+    return {
+        "id": "chatcmpl-fixture",
+        "object": "chat.completion",
+        "created": 0,
+        "model": request.get("model", "fixture"),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        },
+    }
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store: FixtureStore, record: bool = False, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0, league: str = None):
+        super().__init__(address, _Handler)
+        self.store = store
+        self.league = get_league(league or store.manifest.get("league", "nfl"))
+        self.record = record
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.stats: Dict[str, int] = {}
+        self.stats_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """
+        Environment variables that point the pipeline at this server.
+        """
+        return {
+            "ESPN_SITE_API_BASE": f"{self.base_url}/site",
+            "ESPN_CORE_API_BASE": f"{self.base_url}/core",
+            "ESPN_LEAGUE": self.league.key,
+            "OPENAI_BASE_URL": f"{self.base_url}/openai/v1",
+            "OPENAI_API_KEY": "sk-fixture-server",
+        }
+
+    def count(self, name: str) -> None:
+        with self.stats_lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def reset_stats(self) -> Dict[str, int]:
+        with self.stats_lock:
+            stats, self.stats = self.stats, {}
+        return stats
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FixtureServer
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers: Dict[str, str] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject_faults(self) -> bool:
+        server = self.server
+        if server.latency or server.jitter:
+            time.sleep(server.latency + server.random.uniform(0, server.jitter))
+        if server.error_rate and server.random.random() < server.error_rate:
+            server.count("injected_errors")
+            self._send(503, b'{"error": "injected"}', {"Retry-After": "0"})
+            return True
+        return False
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == "/__stats":
+            self._send(200, json.dumps(self.server.reset_stats()).encode("utf-8"))
+            return
+
+        key = request_key(parsed.path, parsed.query)
+        self.server.count("requests")
+        self.server.count(f"requests:{_endpoint(key)}")
+        if self._inject_faults():
+            return
+
+        found = self.server.store.get(key)
+        if found is None and self.server.record:
+            found = self._record(parsed.path, parsed.query, key)
+        if found is None:
+            self.server.count("missing")
+            self._send(404, b'{"error": "not recorded"}')
+            return
+
+        status, body = found
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send(status, body, {"ETag": etag} if status == 200 else None)
+
+    def _record(self, path: str, query: str, key: str) -> Optional[Tuple[int, bytes]]:
+        import requests
+
+        base, _, rest = path.strip("/").partition("/")
+        league = self.server.league
+        upstream = {"site": league.site_api_base, "core": league.core_api_base}.get(base)
+        if upstream is None:
+            return None
+        response = requests.get(f"{upstream}/{rest}", params=parse_qsl(query), timeout=30,
+                                headers={"User-Agent": "Mozilla/5.0 (fixture recorder)"})
+        if response.status_code == 200 or 400 <= response.status_code < 500:
+            self.server.store.put(key, response.status_code, response.content)
+        return response.status_code, response.content
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        if not parsed.path.endswith("/chat/completions"):
+            self._send(404, b'{"error": "unknown endpoint"}')
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        self.server.count("openai_requests")
+        if self._inject_faults():
+            return
+        self._send(200, json.dumps(_canned_chat_completion(request)).encode("utf-8"))
+
+
+def start_server(store: FixtureStore, port: int = 0, **options) -> FixtureServer:
+    """
+    Start a fixture server on a background thread and return it.
+    """
+    server = FixtureServer(("127.0.0.1", port), store, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def generate_season(
+    directory: str, season: int = 2024, teams: int = 32, weeks: int = None, seed: int = 7, league: str = "nfl"
+) -> None:
+    """
+    Write a synthetic season shaped like ESPN's payloads, with /summary bodies padded
+    with plays, drives and news to a realistic size. Weeks default to the league's
+    regular season. The NFL postseason is a 12 team bracket over scoreboard weeks 1-3
+    and 5; college football gets one week of bowls for two thirds of the teams. Run it
+    again with another --season to add more seasons to the same directory.
+    """
+    league = get_league(league)
+    weeks = weeks or len(league.season_type_weeks[REGULAR_SEASON])
+    rng = random.Random(seed + season)
+    store = FixtureStore(directory)
+    team_ids = [str(i) for i in range(1, teams + 1)]
+    site, core = "site", "core"
+    # NFL ids keep their original numbering; bigger leagues need room for 1000+ games.
+    first_event_id = 401000000 + season * (1000 if league.key == "nfl" else 10000)
+
+    def put(path, params, payload):
+        store.put(request_key(path, urlencode(params)), 200, json.dumps(payload).encode("utf-8"))
+
+    put(f"{site}/teams", {"region": "us", "lang": "en", **league.team_params}, {"sports": [{"leagues": [{"teams": [
+        {"team": {"id": tid, "displayName": f"Team {tid}", "abbreviation": f"T{tid}", "location": f"City {tid}"}}
+        for tid in team_ids
+    ]}]}]})
+
+    games = []
+    for week in range(1, weeks + 1):
+        order = team_ids[:]
+        rng.shuffle(order)
+        for home, away in zip(order[0::2], order[1::2]):
+            games.append({"id": str(first_event_id + len(games)), "week": week, "home": home,
+                          "away": away, "type": REGULAR_SEASON})
+    if league.key == "nfl":
+        playoff_teams, bracket = team_ids[:12], ((1, 4), (2, 4), (3, 2), (5, 1))
+    else:
+        playoff_teams, bracket = team_ids[:2 * (teams // 3)], ((1, teams // 3),)
+    for week, count in bracket:
+        rng.shuffle(playoff_teams)
+        for home, away in zip(playoff_teams[0:2 * count:2], playoff_teams[1:2 * count:2]):
+            games.append({"id": str(first_event_id + len(games)), "week": week, "home": home,
+                          "away": away, "type": POSTSEASON})
+
+    def event_payload(game):
+        status = {"type": {"completed": True, "state": "post", "name": "STATUS_FINAL"}}
+        return {
+            "id": game["id"],
+            "date": f"{season}-09-{min(28, game['week']):02d}T17:00Z",
+            "week": {"number": game["week"]},
+            "status": status,
+            "competitions": [{
+                "id": game["id"],
+                "status": status,
+                "competitors": [
+                    {"id": game["home"], "homeAway": "home", "team": {"id": game["home"]}, "score": str(rng.randint(3, 42))},
+                    {"id": game["away"], "homeAway": "away", "team": {"id": game["away"]}, "score": str(rng.randint(3, 42))},
+                ],
+            }],
+        }
+
+    events = {game["id"]: event_payload(game) for game in games}
+    for season_type, type_weeks in ((REGULAR_SEASON, range(1, weeks + 1)), (POSTSEASON, league.season_type_weeks[POSTSEASON])):
+        type_games = [g for g in games if g["type"] == season_type]
+        for tid in team_ids:
+            put(f"{site}/teams/{tid}/schedule", {"season": season, "seasontype": season_type},
+                {"events": [events[g["id"]] for g in type_games if tid in (g["home"], g["away"])]})
+        for week in type_weeks:
+            put(f"{site}/scoreboard", {"dates": season, "seasontype": season_type, "week": week, **league.scoreboard_params},
+                {"events": [events[g["id"]] for g in type_games if g["week"] == week]})
+
+    for game in games:
+        def team_stats(tid):
+            passing, rushing = rng.randint(120, 380), rng.randint(40, 200)
+            return {"team": {"id": tid}, "statistics": [
+                {"name": "firstDowns", "displayValue": str(rng.randint(10, 30))},
+                {"name": "thirdDownEff", "displayValue": f"{rng.randint(2, 9)}-{rng.randint(10, 16)}"},
+                {"name": "totalYards", "displayValue": f"{passing + rushing:,}", "value": passing + rushing},
+                {"name": "netPassingYards", "displayValue": str(passing)},
+                {"name": "rushingYards", "displayValue": str(rushing)},
+                {"name": "interceptions", "displayValue": str(rng.randint(0, 2))},
+                {"name": "sacksYardsLost", "displayValue": f"{rng.randint(0, 5)}-{rng.randint(0, 40)}"},
+                {"name": "turnovers", "displayValue": str(rng.randint(0, 4))},
+                {"name": "redZoneAttempts", "displayValue": f"{rng.randint(0, 4)}-{rng.randint(4, 6)}"},
+            ]}
+
+        put(f"{site}/summary", {"event": game["id"]}, {
+            "boxscore": {"teams": [team_stats(game["home"]), team_stats(game["away"])],
+                         "players": [{"athletes": [{"id": i, "stats": ["1"] * 12} for i in range(60)]}] * 2},
+            "drives": {"previous": [{"plays": [{"text": "x" * 180, "id": i} for i in range(10)]} for _ in range(22)]},
+            "plays": [{"text": "y" * 180, "clock": {"displayValue": "1:00"}} for _ in range(160)],
+            "header": {"competitions": [events[game["id"]]["competitions"][0]]},
+            "news": {"articles": [{"headline": "z" * 120, "story": "w" * 1500} for _ in range(6)]},
+        })
+
+    for tid in team_ids:
+        put(f"{core}/seasons/{season}/types/2/teams/{tid}/record", {"lang": "en", "region": "us"},
+            {"items": [{"stats": [{"name": "pointsAgainst", "value": float(rng.randint(250, 480))}]}]})
+        put(f"{core}/seasons/{season}/types/2/teams/{tid}/statistics", {"lang": "en", "region": "us", "contentorigin": "espn"},
+            {"splits": {"categories": [
+                {"name": "defensive", "stats": [{"name": "sacks", "value": float(rng.randint(20, 60))}]},
+                {"name": "defensiveInterceptions", "stats": [{"name": "interceptions", "value": float(rng.randint(5, 25))}]},
+                {"name": "miscellaneous", "stats": [{"name": "totalTakeaways", "value": float(rng.randint(10, 35))}]},
+            ]}})
+
+    store.save(season=season, league=league.key, source="synthetic", teams=teams, weeks=weeks, created=time.time())
+
+
+def record_season(directory: str, season: int, league: str = "nfl") -> None:
+    """
+    Proxy live ESPN while running the pipeline once with both discovery strategies,
+    then a backfill of the season with its postseason, saving every response.
+    """
+    store = FixtureStore(directory)
+    server = start_server(store, record=True, league=league)
+    with tempfile.TemporaryDirectory() as state_dir:
+        for strategy in ("scoreboard", "schedule"):
+            env = dict(os.environ, **server.env(), NFL_SEASON=str(season), ESPN_CACHE="0", ESPN_INCREMENTAL="0",
+                       ESPN_EVENT_DISCOVERY=strategy, ESPN_STATE_DIR=state_dir,
+                       ESPN_WAREHOUSE=os.path.join(state_dir, "warehouse.sqlite"))
+            subprocess.run([sys.executable, "-c", "import learningESPN; learningESPN.fetch_nfl_defensive_stats()"],
+                           cwd=REPO_DIR, env=env, check=True)
+        subprocess.run([sys.executable, "learningESPN.py", "backfill", str(season), "--force"],
+                       cwd=REPO_DIR, env=dict(env, ESPN_EVENT_DISCOVERY="scoreboard"), check=True)
+    store.save(season=season, league=league, source="recorded", created=time.time())
+    print(f"Recorded {len(store.index)} responses to {directory}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    record = sub.add_parser("record")
+    record.add_argument("directory")
+    record.add_argument("--season", type=int, required=True)
+    record.add_argument("--league", default="nfl")
+    generate = sub.add_parser("generate")
+    generate.add_argument("directory")
+    generate.add_argument("--season", type=int, default=2024)
+    generate.add_argument("--teams", type=int, default=32)
+    generate.add_argument("--weeks", type=int, default=None, help="regular season weeks (default: the league's)")
+    generate.add_argument("--league", default="nfl")
+    serve = sub.add_parser("serve")
+    serve.add_argument("directory")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    serve.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        record_season(args.directory, args.season, args.league)
+    elif args.command == "generate":
+        generate_season(args.directory, args.season, args.teams, args.weeks, league=args.league)
+        print(f"Wrote synthetic season {args.season} to {args.directory}")
+    else:
+        server = FixtureServer(("127.0.0.1", args.port), FixtureStore(args.directory), latency=args.latency,
+                               jitter=args.jitter, error_rate=args.error_rate)
+        print(f"Serving {args.directory} at {server.base_url}")
+        for name, value in server.env().items():
+            print(f"  {name}={value}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
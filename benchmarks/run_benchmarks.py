@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+End-to-end offline benchmark of fetch_and_save_nfl against the fixture server.
+
+Each mode runs in a fresh subprocess and temporary working directory, and reports
+wall time, ESPN and OpenAI requests issued, peak RSS and per-stage timings from the
+run report. No network access is needed.
+
+    python benchmarks/fixture_server.py generate fixtures/synthetic
+    python benchmarks/run_benchmarks.py fixtures/synthetic --latency 0.02
+    python benchmarks/run_benchmarks.py fixtures/synthetic --json results.json
+    python benchmarks/run_benchmarks.py fixtures/synthetic --baseline results.json --tolerance 0.25
+
+With --baseline, exits non-zero if any mode's wall time or request count regressed
+by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_server import REPO_DIR, FixtureStore, start_server  # noqa: E402
+
+# Environment per mode. "warm" runs the default mode twice in the same directory
+# and reports the second run, which is served from the cache and the warehouse.
+MODES = {
+    "serial": {
+        "ESPN_MAX_WORKERS": "1",
+        "ESPN_EVENT_DISCOVERY": "schedule",
+        "ESPN_CACHE": "0",
+        "ESPN_INCREMENTAL": "0",
+        "ESPN_STREAM_SUMMARIES": "0",
+        "ESPN_TEAM_STATS": "endpoints",
+        "AI_MAX_CONCURRENCY": "1",
+        "AI_BATCH_SIZE": "1",
+    },
+    "concurrent": {"ESPN_CACHE": "0", "ESPN_INCREMENTAL": "0"},
+    "batched_ai": {"ESPN_CACHE": "0", "ESPN_INCREMENTAL": "0", "AI_BATCH_SIZE": "8"},
+    "warm": {},
+}
+
+CHILD_SCRIPT = """
+import json, resource, sys, time
+sys.path.insert(0, {repo!r})
+import learningESPN
+for _ in range({runs}):
+    start = time.perf_counter()
+    learningESPN.fetch_and_save_nfl()
+    wall = time.perf_counter() - start
+print("BENCH_RESULT " + json.dumps({{
+    "wall_seconds": round(wall, 3),
+    "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    "stages": learningESPN.METRICS.last_report["stages"],
+}}))
+"""
+
+
+def run_mode(server, season: int, mode: str, rate_limit: str) -> dict:
+    runs = 2 if mode == "warm" else 1
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, **server.env(), **MODES[mode], NFL_SEASON=str(season), ESPN_RATE_LIMIT=rate_limit,
+                   AI_RATE_LIMIT="0")
+        if runs > 1:
+            subprocess.run([sys.executable, "-c", CHILD_SCRIPT.format(repo=REPO_DIR, runs=1)], cwd=workdir, env=env,
+                           check=True, capture_output=True)
+        server.reset_stats()
+        completed = subprocess.run([sys.executable, "-c", CHILD_SCRIPT.format(repo=REPO_DIR, runs=1)], cwd=workdir,
+                                   env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Mode {mode} failed:\n{completed.stdout}\n{completed.stderr}")
+    result_line = [line for line in completed.stdout.splitlines() if line.startswith("BENCH_RESULT ")][-1]
+    result = json.loads(result_line[len("BENCH_RESULT "):])
+    stats = server.reset_stats()
+    result["espn_requests"] = stats.get("requests", 0)
+    result["openai_requests"] = stats.get("openai_requests", 0)
+    result["missing_fixtures"] = stats.get("missing", 0)
+    return result
+
+
+def check_regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    failures = []
+    for mode, result in results.items():
+        previous = baseline.get(mode)
+        if not previous:
+            continue
+        for metric in ("wall_seconds", "espn_requests", "openai_requests"):
+            limit = previous[metric] * (1 + tolerance)
+            if result[metric] > limit and result[metric] - previous[metric] > 0.05:
+                failures.append(f"{mode}: {metric} {result[metric]} > baseline {previous[metric]} (+{tolerance:.0%})")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark.")
+    parser.add_argument("fixtures", help="fixture directory (see fixture_server.py)")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated modes to run")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fixture response")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", default="0", help="ESPN_RATE_LIMIT for the runs (0 disables)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    store = FixtureStore(args.fixtures)
+    if not store.index:
+        parser.error(f"No fixtures in {args.fixtures}; run fixture_server.py generate or record first.")
+    season = store.manifest.get("season")
+    server = start_server(store, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+
+    results = {}
+    print(f"{'mode':<12}{'wall s':>9}{'espn req':>10}{'ai req':>8}{'rss MB':>9}  stages")
+    for mode in args.modes.split(","):
+        result = run_mode(server, season, mode, args.rate_limit)
+        results[mode] = result
+        stages = " ".join(f"{name}={seconds:.2f}" for name, seconds in result["stages"].items())
+        print(f"{mode:<12}{result['wall_seconds']:>9.2f}{result['espn_requests']:>10}"
+              f"{result['openai_requests']:>8}{result['peak_rss_mb']:>9.1f}  {stages}")
+        if result["missing_fixtures"]:
+            print(f"  warning: {result['missing_fixtures']} requests had no recorded fixture")
+    server.shutdown()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = check_regressions(results, json.load(f), args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
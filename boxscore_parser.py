@@ -0,0 +1,32 @@
+# boxscore_parser.py
+"""
+Partial parsing of ESPN /summary payloads.
+
+A summary response carries plays, drives, news, odds and more, but the pipeline only
+reads the boxscore team statistics. These helpers pull just `boxscore.teams` out of
+the response stream with ijson's C-backed incremental parser: other fields are never
+built into Python objects, and parsing stops as soon as the boxscore has been read.
+This lowers peak memory per response rather than parse time.
+ijson is imported on first use.
+"""
+from typing import IO, Dict
+
+BOXSCORE_TEAMS_PATH = "boxscore.teams"
+
+
+def parse_summary_stream(stream: IO[bytes]) -> Dict:
+    """
+    Stream-parse a /summary response into a trimmed payload of the same shape that
+    keeps only `boxscore.teams`. The stream may be left partially unread.
+    """
+    import ijson
+
+    teams = next(ijson.items(stream, BOXSCORE_TEAMS_PATH, use_float=True), [])
+    return {"boxscore": {"teams": teams}}
+
+
+def trim_summary(payload: Dict) -> Dict:
+    """
+    Reduce an already parsed /summary payload to what `parse_summary_stream` keeps.
+    """
+    return {"boxscore": {"teams": payload.get("boxscore", {}).get("teams", [])}}
@@ -0,0 +1,369 @@
+# espn_http.py
+"""
+Shared plumbing for talking to ESPN: a token-bucket rate limiter, a
+bounded-concurrency map used by the fetch stages in learningESPN.py, a pooled
+keep-alive HTTP session and a persistent response cache.
+
+`requests` is imported when the first request is made, not at import time, so the
+web app starts quickly.
+"""
+import email.utils
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+from urllib.parse import urlencode, urlparse
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name, "").strip()
+    try:
+        return int(value) if value else default
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.getenv(name, "").strip()
+    try:
+        return float(value) if value else default
+    except ValueError:
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name, "").strip().lower()
+    return value not in ("0", "false", "no") if value else default
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket. `rate` is requests per second, `burst` the bucket size.
+    A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Reserve a token even if the bucket is empty; a negative balance is the
+            # queue of callers already waiting for future refills.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+MAX_WORKERS = env_int("ESPN_MAX_WORKERS", 8)
+RATE_LIMITER = RateLimiter(
+    rate=env_float("ESPN_RATE_LIMIT", 20.0),
+    burst=env_int("ESPN_RATE_BURST", 20),
+)
+
+
+def concurrent_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_workers: int = None,
+    progress: Callable[[int, int], None] = None,
+) -> List[R]:
+    """
+    Apply `func` to every item with at most `max_workers` calls in flight.
+    Results come back in input order, so callers see the same output as a serial loop.
+    With max_workers <= 1 the items are processed serially in the calling thread.
+    `progress(done, total)` is called after each item completes.
+    """
+    items = list(items)
+    total = len(items)
+    workers = MAX_WORKERS if max_workers is None else max_workers
+
+    if progress is not None:
+        counter_lock = threading.Lock()
+        counter = {"done": 0}
+        inner = func
+
+        def func(item):
+            result = inner(item)
+            with counter_lock:
+                counter["done"] += 1
+                progress(counter["done"], total)
+            return result
+
+    if workers <= 1 or total <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, total)) as executor:
+        return list(executor.map(func, items))
+
+
+# Statuses worth retrying; any other non-2xx response fails immediately.
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+MAX_RETRY_AFTER = 60.0
+
+
+class HTTPStatusError(RuntimeError):
+    """
+    Non-success HTTP response. `retryable` is False for permanent client errors.
+    """
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = status_code in RETRYABLE_STATUSES
+
+
+def retry_after_seconds(response: "requests.Response") -> Optional[float]:
+    """
+    Parse a Retry-After header (delta-seconds or HTTP date), capped at MAX_RETRY_AFTER.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(MAX_RETRY_AFTER, max(0.0, seconds))
+
+
+class PooledSession:
+    """
+    A requests.Session shared by all fetch threads, with a keep-alive connection pool
+    of `pool_size` per host. The pool blocks rather than opening extra connections,
+    so it also caps in-flight requests per host.
+    """
+
+    def __init__(self, pool_size: int):
+        self.pool_size = pool_size
+        self.session = None
+        self.adapter = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> "requests.Session":
+        # Created on first use so importing this module stays cheap, and so a
+        # preforking server never shares sockets between worker processes.
+        with self._lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                self.adapter = HTTPAdapter(
+                    pool_connections=4, pool_maxsize=self.pool_size, pool_block=True, max_retries=0
+                )
+                session.mount("https://", self.adapter)
+                session.mount("http://", self.adapter)
+                session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+                self.session = session
+            return self.session
+
+    def get(self, url: str, **kwargs) -> "requests.Response":
+        return (self.session or self._connect()).get(url, **kwargs)
+
+    def connection_stats(self) -> Dict[str, int]:
+        """
+        Connections opened vs reused across every host pool, from urllib3's counters.
+        """
+        opened = issued = 0
+        if self.adapter is None:
+            return {"requests": 0, "connections_opened": 0, "connections_reused": 0}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            issued += pool.num_requests
+        return {"requests": issued, "connections_opened": opened, "connections_reused": max(0, issued - opened)}
+
+
+HTTP_SESSION = PooledSession(pool_size=env_int("ESPN_POOL_SIZE", max(MAX_WORKERS, 1)))
+
+
+# Seconds a cached response stays fresh, by endpoint suffix. Responses that never
+# change (final game summaries) are cached without expiry by callers passing
+# `immutable` to `_make_request`.
+CACHE_TTLS = {
+    "/schedule": 300,
+    "/scoreboard": 300,
+    "/record": 900,
+    "/statistics": 900,
+    "/teams": 86400,
+}
+DEFAULT_CACHE_TTL = 300
+
+
+def _ttl_for(url: str) -> int:
+    """
+    Pick a freshness lifetime for a response from its endpoint.
+    """
+    path = urlparse(url).path.rstrip("/")
+    for suffix, ttl in CACHE_TTLS.items():
+        if path.endswith(suffix):
+            return ttl
+    return DEFAULT_CACHE_TTL
+
+
+class CachedResponse:
+    __slots__ = ("payload", "etag", "last_modified", "expires_at")
+
+    def __init__(self, payload: Dict, etag: Optional[str], last_modified: Optional[str], expires_at: Optional[float]):
+        self.payload = payload
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at is None or self.expires_at > time.time()
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    On-disk cache of JSON responses in SQLite, keyed by URL and query params.
+    Bodies are zlib-compressed. Once the total body size exceeds `max_bytes`, the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires_at REAL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict] = None) -> str:
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+
+    def get(self, url: str, params: Optional[Dict] = None) -> Optional[CachedResponse]:
+        key = self.key(url, params)
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT body, etag, last_modified, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+        body, etag, last_modified, expires_at = row
+        return CachedResponse(json.loads(zlib.decompress(body)), etag, last_modified, expires_at)
+
+    def put(
+        self,
+        url: str,
+        params: Optional[Dict],
+        payload: Dict,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        immutable: bool = False,
+    ) -> None:
+        """
+        Store a response. `immutable` marks it as never expiring (e.g. a final game's
+        boxscore) regardless of the endpoint's TTL.
+        """
+        ttl = None if immutable else _ttl_for(url)
+        expires_at = None if ttl is None else time.time() + ttl
+        body = zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.key(url, params), body, len(body), etag, last_modified, expires_at, time.time()),
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def revalidated(self, url: str, params: Optional[Dict], cached: CachedResponse, immutable: bool = False) -> None:
+        """
+        Record a 304 Not Modified: the stored body is good for another TTL.
+        """
+        ttl = None if immutable else _ttl_for(url)
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "UPDATE responses SET expires_at = ?, last_access = ? WHERE key = ?",
+                (expires_at, time.time(), self.key(url, params)),
+            )
+            conn.commit()
+
+    def delete(self, url: str, params: Optional[Dict] = None) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses WHERE key = ?", (self.key(url, params),))
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so we don't evict on every insert once the cache is full.
+        target = int(self.max_bytes * 0.9)
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= target:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+
+RESPONSE_CACHE = (
+    ResponseCache(
+        os.path.join(os.getenv("ESPN_CACHE_DIR", ".espn_cache"), "responses.sqlite3"),
+        max_bytes=env_int("ESPN_CACHE_MAX_MB", 200) * 1024 * 1024,
+    )
+    if env_bool("ESPN_CACHE", True)
+    else None
+)
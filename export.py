@@ -0,0 +1,158 @@
+# export.py
+"""
+Streaming writers for pipeline output: XLSX (openpyxl write-only mode), CSV, JSON and
+Parquet. Rows are written as they are consumed from an iterable, so large multi-season
+exports never need a DataFrame or a full in-memory worksheet.
+"""
+import csv
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+FORMATS = ("xlsx", "csv", "json", "parquet")
+MIMETYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "json": "application/json",
+    "parquet": "application/vnd.apache.parquet",
+}
+PARQUET_BATCH_ROWS = 10000
+
+
+def _with_columns(rows: Iterable[Dict], columns: Optional[List[str]]):
+    """
+    Return the column list and an iterator over all rows. Without explicit columns,
+    the first row's keys are used.
+    """
+    iterator = iter(rows)
+    if columns is not None:
+        return list(columns), iterator
+    first = next(iterator, None)
+    if first is None:
+        return [], iter(())
+
+    def chained() -> Iterator[Dict]:
+        yield first
+        yield from iterator
+
+    return list(first.keys()), chained()
+
+
+def _write_xlsx(path: str, columns: List[str], rows: Iterator[Dict]) -> int:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    header = []
+    for name in columns:
+        cell = WriteOnlyCell(sheet, value=name)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    sheet.append(header)
+    count = 0
+    for row in rows:
+        sheet.append([row.get(name) for name in columns])
+        count += 1
+    workbook.save(path)
+    return count
+
+
+def _write_csv(path: str, columns: List[str], rows: Iterator[Dict]) -> int:
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def _write_json(path: str, columns: List[str], rows: Iterator[Dict]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for row in rows:
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps({name: row.get(name) for name in columns}, ensure_ascii=False))
+            count += 1
+        f.write("\n]\n")
+    return count
+
+
+def _write_parquet(path: str, columns: List[str], rows: Iterator[Dict]) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("Parquet export requires pyarrow: pip install pyarrow") from exc
+
+    writer = None
+    count = 0
+    batch: List[Dict] = []
+
+    def flush():
+        nonlocal writer
+        table = pa.Table.from_pylist(batch)
+        if writer is None:
+            writer = pq.ParquetWriter(path, table.schema)
+        writer.write_table(table.cast(writer.schema))
+        batch.clear()
+
+    try:
+        for row in rows:
+            batch.append({name: row.get(name) for name in columns})
+            count += 1
+            if len(batch) >= PARQUET_BATCH_ROWS:
+                flush()
+        if batch or writer is None:
+            flush()
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+_WRITERS = {
+    "xlsx": _write_xlsx,
+    "csv": _write_csv,
+    "json": _write_json,
+    "parquet": _write_parquet,
+}
+
+
+def write_rows(rows: Iterable[Dict], path: str, fmt: str = None, columns: List[str] = None) -> int:
+    """
+    Stream `rows` to `path` in `fmt` (default: from the file extension) and return the
+    number of rows written. The file is written under a temporary name and moved into
+    place, so readers never see a partial export.
+    """
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unsupported export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    columns, iterator = _with_columns(rows, columns)
+    tmp_path = f"{path}.tmp"
+    try:
+        count = _WRITERS[fmt](tmp_path, columns, iterator)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+
+def read_json_rows(path: str) -> List[Dict]:
+    """
+    Load rows written by the JSON exporter.
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def export_path(base_path: str, fmt: str) -> str:
+    """
+    `base_path` with its extension replaced by `fmt`.
+    """
+    return f"{os.path.splitext(base_path)[0]}.{fmt}"
@@ -0,0 +1,130 @@
+# game_calendar.py
+"""
+When the refresh daemon (`learningESPN.py watch`) should look for finished games,
+worked out from the season's schedule.
+
+A game is live from its kickoff until it goes final. ESPN doesn't say when that will
+be, so a game still not final ESPN_WATCH_GAME_HOURS after kickoff (postponed, or
+never updated) stops counting as live. While any game is live the daemon polls every
+ESPN_WATCH_LIVE_INTERVAL seconds; otherwise it sleeps until the next kickoff, waking
+at least every ESPN_WATCH_IDLE_INTERVAL seconds to re-read the schedule for moved
+games.
+
+The calendar and the time of the next check are saved in STATE_DIR/watch.json, so
+`watch --once` run from cron sends no requests until a check is due.
+"""
+import datetime
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from espn_http import env_float
+from records import Event
+from season_state import STATE_DIR, atomic_write_json
+
+LIVE_POLL_SECONDS = env_float("ESPN_WATCH_LIVE_INTERVAL", 300.0)
+IDLE_POLL_SECONDS = env_float("ESPN_WATCH_IDLE_INTERVAL", 6 * 3600.0)
+GAME_HOURS = env_float("ESPN_WATCH_GAME_HOURS", 8.0)
+WATCH_STATE_PATH = os.path.join(STATE_DIR, "watch.json")
+# Shortest sleep, so a kickoff a few seconds away doesn't cause a burst of wakeups.
+MIN_POLL_SECONDS = 30.0
+
+
+def kickoff_time(date: Optional[str]) -> Optional[float]:
+    """
+    An ESPN event date such as "2024-09-08T17:00Z" as a Unix timestamp, or None.
+    """
+    if not date:
+        return None
+    try:
+        kickoff = datetime.datetime.fromisoformat(date.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if kickoff.tzinfo is None:
+        kickoff = kickoff.replace(tzinfo=datetime.timezone.utc)
+    return kickoff.timestamp()
+
+
+class GameCalendar:
+    """
+    The season's events by id with their kickoff times, and when the schedule was
+    read (`read_at`). `update` takes newer event index entries, such as a re-polled
+    scoreboard week.
+    """
+
+    def __init__(self, events: Dict[str, Event] = None, read_at: float = 0.0):
+        self.events: Dict[str, Event] = {}
+        self._kickoffs: Dict[str, Optional[float]] = {}
+        self.read_at = read_at
+        self.update(events or {})
+
+    @classmethod
+    def load(cls, season: int, path: str = WATCH_STATE_PATH) -> Tuple[Optional["GameCalendar"], float]:
+        """
+        The calendar saved for `season` and the time its next check is due. (None, 0.0)
+        when nothing usable is saved.
+        """
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None, 0.0
+        if state.get("season") != season:
+            return None, 0.0
+        events = {event_id: Event.from_context(context) for event_id, context in state.get("events", {}).items()}
+        return cls(events, state.get("read_at", 0.0)), state.get("next_check", 0.0)
+
+    def save(self, season: int, next_check: float, path: str = WATCH_STATE_PATH) -> None:
+        atomic_write_json(path, {
+            "season": season,
+            "read_at": self.read_at,
+            "next_check": next_check,
+            "events": {event_id: event.to_context() for event_id, event in self.events.items()},
+        })
+
+    def update(self, events: Dict[str, Event]) -> None:
+        for event_id, event in events.items():
+            self.events[event_id] = event
+            self._kickoffs[event_id] = kickoff_time(event.date)
+
+    def live(self, now: float) -> List[str]:
+        """
+        Ids of games that have kicked off, are not final and are within GAME_HOURS of kickoff.
+        """
+        return [
+            event_id for event_id, event in self.events.items()
+            if not event.completed
+            and self._kickoffs[event_id] is not None
+            and self._kickoffs[event_id] <= now < self._kickoffs[event_id] + GAME_HOURS * 3600
+        ]
+
+    def live_weeks(self, now: float) -> List[int]:
+        """
+        Scoreboard weeks of the live games.
+        """
+        return sorted({self.events[event_id].week for event_id in self.live(now) if self.events[event_id].week})
+
+    def completed(self) -> List[str]:
+        return [event_id for event_id, event in self.events.items() if event.completed]
+
+    def next_kickoff(self, now: float) -> Optional[float]:
+        """
+        Kickoff time of the next game not yet started, or None when the schedule is done.
+        """
+        upcoming = [
+            kickoff for event_id, kickoff in self._kickoffs.items()
+            if kickoff is not None and kickoff > now and not self.events[event_id].completed
+        ]
+        return min(upcoming) if upcoming else None
+
+    def next_poll(self, now: float) -> float:
+        """
+        Seconds to wait before polling again: LIVE_POLL_SECONDS during games, otherwise
+        until the next kickoff, capped at IDLE_POLL_SECONDS.
+        """
+        if self.live(now):
+            return max(LIVE_POLL_SECONDS, MIN_POLL_SECONDS)
+        kickoff = self.next_kickoff(now)
+        if kickoff is None:
+            return IDLE_POLL_SECONDS
+        return max(min(kickoff - now, IDLE_POLL_SECONDS), MIN_POLL_SECONDS)
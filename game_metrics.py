@@ -0,0 +1,274 @@
+# game_metrics.py
+"""
+Per-game defensive metrics computed from the boxscores stored in the warehouse.
+
+`GameMatrix.load` reads a season's boxscores once into a NumPy matrix with one row
+per team per game, holding what that team's defense allowed. Season totals,
+per-game averages, third-down and red-zone rates and rolling N-week windows are
+then computed for every team at once with array operations. Teams and events are
+stored as small integer codes into one list of ids each, so many seasons of games
+fit in a few compact arrays.
+
+NumPy is imported when a matrix is built, so importing this module stays cheap.
+"""
+import os
+import re
+from array import array
+from typing import Dict, List, Sequence
+
+from espn_http import env_int
+from records import intern_id
+from warehouse import REGULAR_SEASON, WAREHOUSE, StatsWarehouse
+
+# Weeks in the "recent" window of season metrics and the default rolling window.
+ROLLING_WEEKS = env_int("ESPN_ROLLING_WEEKS", 4)
+
+# Boxscore team statistics: key -> (ESPN stat name, part). Part 1 is the second number
+# of a "made-attempts" value such as thirdDownEff "5-12".
+BOXSCORE_STATS = {
+    "yards": ("totalYards", 0),
+    "passing_yards": ("netPassingYards", 0),
+    "rushing_yards": ("rushingYards", 0),
+    "turnovers": ("turnovers", 0),
+    "interceptions_thrown": ("interceptions", 0),
+    "sacked": ("sacksYardsLost", 0),
+    "third_down_conversions": ("thirdDownEff", 0),
+    "third_down_attempts": ("thirdDownEff", 1),
+    "red_zone_scores": ("redZoneAttempts", 0),
+    "red_zone_trips": ("redZoneAttempts", 1),
+}
+
+# Matrix columns: what a defense allowed -> the opponent's boxscore stat it comes from.
+DEFENSE_COLUMNS = {
+    "yards_allowed": "yards",
+    "passing_yards_allowed": "passing_yards",
+    "rushing_yards_allowed": "rushing_yards",
+    "takeaways": "turnovers",
+    "interceptions": "interceptions_thrown",
+    "sacks": "sacked",
+    "third_down_conversions_allowed": "third_down_conversions",
+    "third_down_attempts": "third_down_attempts",
+    "red_zone_scores_allowed": "red_zone_scores",
+    "red_zone_trips": "red_zone_trips",
+}
+COLUMNS = ("points_allowed",) + tuple(DEFENSE_COLUMNS)
+
+_LEADING_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_MADE_ATTEMPTS = re.compile(r"^(\d+)\s*-\s*(\d+)")
+
+
+def _boxscore_number(value, part: int = 0) -> int:
+    """
+    Parse a boxscore value such as 412, "1,234", "-6" or one half of "3-21".
+    """
+    if isinstance(value, (int, float)):
+        return int(value) if part == 0 else 0
+    text = str(value).replace(",", "").strip()
+    if part:
+        match = _MADE_ATTEMPTS.match(text)
+        return int(match.group(part + 1)) if match else 0
+    match = _LEADING_NUMBER.match(text)
+    return int(float(match.group())) if match else 0
+
+
+def parse_boxscore_teams(teams: List[Dict]) -> Dict[str, Dict[str, int]]:
+    """
+    Each team's BOXSCORE_STATS from a boxscore's `teams` list, keyed by team id.
+    Returns an empty dict unless both teams are present.
+    """
+    if len(teams) != 2:
+        return {}
+    parsed = {}
+    for team_entry in teams:
+        tid = team_entry.get("team", {}).get("id")
+        values = {
+            stat.get("name"): stat.get("displayValue") or stat.get("value")
+            for stat in team_entry.get("statistics", [])
+        }
+        if tid:
+            parsed[tid] = {
+                key: _boxscore_number(values.get(name, 0), part) for key, (name, part) in BOXSCORE_STATS.items()
+            }
+    return parsed if len(parsed) == 2 else {}
+
+
+class GameMatrix:
+    """
+    One row per team per game with the COLUMNS that team's defense allowed (whole
+    numbers, as int32). Rows name their team, opponent and event by codes into
+    `teams` (sorted team ids) and `events` (one id per game).
+    """
+
+    def __init__(self, teams: Sequence[str], events: Sequence[str], team_codes, opponent_codes, event_codes,
+                 weeks, values):
+        self.teams = list(teams)
+        self.events = list(events)
+        self.team_codes = team_codes
+        self.opponent_codes = opponent_codes
+        self.event_codes = event_codes
+        self.weeks = weeks
+        self.values = values
+
+    @classmethod
+    def load(
+        cls, season: int, season_type: int = REGULAR_SEASON, warehouse: StatsWarehouse = None
+    ) -> "GameMatrix":
+        """
+        Build the matrix for one season type from the warehouse in a single pass over
+        its stored boxscores, parsing one at a time. Points come from the stored scores.
+        """
+        import numpy as np
+
+        warehouse = warehouse or WAREHOUSE
+        points = warehouse.points_allowed(season, season_type)
+        codes: Dict[str, int] = {}
+        events: List[str] = []
+        team_codes, opponent_codes, event_codes = array("i"), array("i"), array("i")
+        weeks, values = array("h"), array("i")
+        for game in warehouse.boxscores(season, season_type):
+            parsed = parse_boxscore_teams(game["teams"])
+            if not parsed:
+                continue
+            event_id = intern_id(game["event_id"])
+            first, second = parsed
+            for team_id, opponent_id in ((first, second), (second, first)):
+                opponent = parsed[opponent_id]
+                values.append(points.get((event_id, team_id)) or 0)
+                values.extend(opponent[key] for key in DEFENSE_COLUMNS.values())
+                team_codes.append(codes.setdefault(intern_id(team_id), len(codes)))
+                opponent_codes.append(codes.setdefault(intern_id(opponent_id), len(codes)))
+                event_codes.append(len(events))
+                weeks.append(game["week"] or 0)
+            events.append(event_id)
+
+        # Renumber teams in sorted id order, so per-team results come out sorted by id.
+        teams = sorted(codes)
+        rank = np.empty(len(codes), dtype=np.int32)
+        rank[[codes[team_id] for team_id in teams]] = np.arange(len(teams), dtype=np.int32)
+        return cls(
+            teams,
+            events,
+            rank[np.frombuffer(team_codes, dtype=np.int32)],
+            rank[np.frombuffer(opponent_codes, dtype=np.int32)],
+            np.frombuffer(event_codes, dtype=np.int32).copy(),
+            np.frombuffer(weeks, dtype=np.int16).copy(),
+            np.frombuffer(values, dtype=np.int32).reshape(-1, len(COLUMNS)).copy(),
+        )
+
+    @staticmethod
+    def _ids(names: Sequence[str], codes):
+        import numpy as np
+
+        return np.array(names, dtype=object)[codes]
+
+    @property
+    def team_ids(self):
+        """
+        Each row's team id (an object array decoded from the codes).
+        """
+        return self._ids(self.teams, self.team_codes)
+
+    @property
+    def opponent_ids(self):
+        return self._ids(self.teams, self.opponent_codes)
+
+    @property
+    def event_ids(self):
+        return self._ids(self.events, self.event_codes)
+
+    def __len__(self) -> int:
+        return len(self.team_codes)
+
+    def _by_team(self):
+        """
+        Distinct team ids, each row's team index, and a row order sorted by team then week.
+        """
+        import numpy as np
+
+        inverse = self.team_codes
+        order = np.lexsort((self.weeks, inverse))
+        return np.array(self.teams, dtype=object), inverse, order
+
+    def rolling(self, window: int = None) -> List[Dict]:
+        """
+        Each team's average over its last `window` games up to and including every
+        game, in team then week order. Uses per-team cumulative sums, so the cost does
+        not depend on the window size.
+        """
+        import numpy as np
+
+        window = window or ROLLING_WEEKS
+        if not len(self):
+            return []
+        teams, inverse, order = self._by_team()
+        sorted_team = inverse[order]
+        cumulative = np.cumsum(self.values[order], axis=0, dtype=np.float64)
+        position = np.arange(len(order))
+        # Row index where each row's team starts in sorted order.
+        starts = np.searchsorted(sorted_team, sorted_team, side="left")
+        lag = np.maximum(position - window, starts - 1)
+        previous = np.where((lag >= 0)[:, None], cumulative[np.maximum(lag, 0)], 0.0)
+        averages = (cumulative - previous) / (position - lag)[:, None]
+
+        names = ("team_id", "opponent_id", "event_id", "week", "games_in_window")
+        names += tuple(f"{name}_avg" for name in COLUMNS)
+        columns = zip(
+            teams[inverse[order]].tolist(),
+            teams[self.opponent_codes[order]].tolist(),
+            np.array(self.events, dtype=object)[self.event_codes[order]].tolist(),
+            self.weeks[order].tolist(),
+            (position - lag).tolist(),
+            *np.round(averages, 2).T.tolist(),
+        )
+        return [dict(zip(names, row)) for row in columns]
+
+    def season_metrics(self, window: int = None) -> Dict[str, Dict[str, float]]:
+        """
+        Per-team season totals, per-game averages, third-down and red-zone conversion
+        rates allowed (percent), and per-game averages over the last `window` games.
+        """
+        import numpy as np
+
+        window = window or ROLLING_WEEKS
+        if not len(self):
+            return {}
+        teams, inverse, order = self._by_team()
+        games = np.bincount(inverse, minlength=len(teams)).astype(np.float64)
+        totals = np.zeros((len(teams), len(COLUMNS)))
+        np.add.at(totals, inverse, self.values)
+
+        # The last `window` games of each team, using positions within the team's sorted rows.
+        sorted_team = inverse[order]
+        starts = np.searchsorted(sorted_team, sorted_team, side="left")
+        rank_from_end = games[sorted_team] - (np.arange(len(order)) - starts)
+        recent_rows = order[rank_from_end <= window]
+        recent_games = np.bincount(inverse[recent_rows], minlength=len(teams)).astype(np.float64)
+        recent = np.zeros((len(teams), len(COLUMNS)))
+        np.add.at(recent, inverse[recent_rows], self.values[recent_rows])
+
+        def col(matrix, name):
+            return matrix[:, COLUMNS.index(name)]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_game = totals / games[:, None]
+            recent_per_game = recent / recent_games[:, None]
+            third_down = 100 * col(totals, "third_down_conversions_allowed") / col(totals, "third_down_attempts")
+            red_zone = 100 * col(totals, "red_zone_scores_allowed") / col(totals, "red_zone_trips")
+
+        metrics = {
+            "games": games,
+            "third_down_pct_allowed": third_down,
+            "red_zone_pct_allowed": red_zone,
+            "recent_points_allowed_per_game": col(recent_per_game, "points_allowed"),
+            "recent_yards_allowed_per_game": col(recent_per_game, "yards_allowed"),
+        }
+        for name in COLUMNS:
+            metrics[name] = col(totals, name)
+        for name in ("points_allowed", "yards_allowed", "passing_yards_allowed", "rushing_yards_allowed"):
+            metrics[f"{name}_per_game"] = col(per_game, name)
+
+        columns = {name: np.round(np.nan_to_num(values), 1).tolist() for name, values in metrics.items()}
+        return {
+            team_id: {name: columns[name][idx] for name in columns}
+            for idx, team_id in enumerate(teams.tolist())
+        }
@@ -0,0 +1,36 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings for serving app.py:
+
+    gunicorn app:app
+
+The app is imported once in the master (preload_app) and the heavy dependencies are
+imported there too, so forked workers start without importing anything. The HTTP
+session and the SQLite response cache are created on first use, so no sockets or
+database handles are shared between workers.
+
+Background jobs and the scheduled refresh live in the worker that started them (see
+jobs.py), so keep a single worker and scale with threads unless job state moves out
+of process.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = True
+
+
+def when_ready(server):
+    from learningESPN import warm_imports
+
+    warm_imports()
+    server.log.info("Imported pipeline dependencies in the master")
+
+
+def post_worker_init(worker):
+    # Threads don't survive the fork, so the refresh timer starts in each worker.
+    from app import refresh_scheduler
+
+    refresh_scheduler.start()
@@ -0,0 +1,193 @@
+# jobs.py
+"""
+Background execution of the fetch pipeline so web requests return immediately.
+
+A single worker thread runs at most one job at a time. Submitting while a job is
+queued or running returns that job instead of starting a duplicate crawl. State is
+held in memory, so each server process has its own runner. `RefreshScheduler`
+submits runs on its own when the published results go stale.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+FINISHED_STATES = ("succeeded", "failed")
+
+
+class Job:
+    """
+    Status of one pipeline run, updated by the worker through `report_progress`.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.state = "queued"
+        self.stage = None
+        self.done = 0
+        self.total = 0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._stage_started_at = None
+        self._version = 0
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def _update(self, **fields) -> None:
+        with self._changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._version += 1
+            self._changed.notify_all()
+
+    def report_progress(self, stage: str, done: int, total: int) -> None:
+        """
+        Progress callback handed to the pipeline: `done` of `total` units in `stage`.
+        """
+        if stage != self.stage:
+            self._stage_started_at = time.time()
+        self._update(stage=stage, done=done, total=total)
+
+    def eta_seconds(self) -> Optional[float]:
+        """
+        Estimated seconds left in the current stage, extrapolated from its progress so far.
+        """
+        if self.finished or not self._stage_started_at or not self.done or not self.total:
+            return None
+        elapsed = time.time() - self._stage_started_at
+        return round(elapsed / self.done * (self.total - self.done), 1)
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """
+        Block until the job changes past `version` (or `timeout` passes); return the new version.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version, timeout=timeout)
+            return self._version
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "stage": self.stage,
+            "done": self.done,
+            "total": self.total,
+            "eta_seconds": self.eta_seconds(),
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobRunner:
+    """
+    Runs `target(progress)` jobs one at a time on a background thread and keeps the
+    most recent `max_history` jobs for status lookups.
+    """
+
+    def __init__(self, target: Callable[[Callable[[str, int, int], None]], object], max_history: int = 20):
+        self.target = target
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-job")
+        self._jobs: Dict[str, Job] = {}
+        self._current: Optional[Job] = None
+        self._lock = threading.Lock()
+
+    def submit(self) -> Job:
+        """
+        Enqueue a run, or return the in-flight job if one is already queued or running.
+        """
+        with self._lock:
+            if self._current and not self._current.finished:
+                return self._current
+            job = Job()
+            self._jobs[job.id] = job
+            self._current = job
+            while len(self._jobs) > self.max_history:
+                del self._jobs[next(iter(self._jobs))]
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self) -> Optional[Job]:
+        with self._lock:
+            return self._current
+
+    def _run(self, job: Job) -> None:
+        job._update(state="running", started_at=time.time())
+        try:
+            result = self.target(job.report_progress)
+        except Exception as exc:
+            job._update(state="failed", error=str(exc), message="Run failed.", finished_at=time.time())
+            return
+        job._update(state="succeeded", result=result, message="Analysis complete!", finished_at=time.time())
+
+
+class RefreshScheduler:
+    """
+    Keeps results fresh by submitting runs to `runner` once they are older than
+    `interval` seconds: from a timer thread, and whenever a reader calls
+    `refresh_if_stale`. `age()` returns the age of the latest results in seconds (None
+    when there are none). After a failed run, the next attempt waits `retry_after`
+    seconds, so a run that keeps failing isn't restarted on every request. An interval
+    of 0 disables it.
+    """
+
+    def __init__(self, runner: JobRunner, interval: float, age: Callable[[], Optional[float]],
+                 retry_after: float = 300.0):
+        self.runner = runner
+        self.interval = interval
+        self.age = age
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def stale(self) -> bool:
+        age = self.age()
+        return age is None or age >= self.interval
+
+    def refresh_if_stale(self) -> Optional[Job]:
+        """
+        Start a run if the results are stale, returning the in-flight job if any.
+        """
+        if self.interval <= 0 or not self.stale():
+            return None
+        with self._lock:
+            job = self.runner.latest()
+            if job and not job.finished:
+                return job
+            if job and job.state == "failed" and time.time() - job.finished_at < self.retry_after:
+                return None
+            return self.runner.submit()
+
+    def start(self) -> None:
+        """
+        Start the timer thread (once per process).
+        """
+        with self._lock:
+            if self.interval <= 0 or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="refresh-scheduler", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        poll = min(self.interval, 60.0)
+        while True:
+            try:
+                self.refresh_if_stale()
+            except Exception as exc:
+                print(f"Scheduled refresh failed to start: {exc}")
+            time.sleep(poll)
@@ -0,0 +1,94 @@
+# leagues.py
+"""
+League descriptors: where a league lives in ESPN's APIs, its season calendar and the
+stats the pipeline reads, so the same fetch pipeline runs for the NFL and for college
+football (FBS, about 134 teams and 800+ games a season). ESPN_LEAGUE picks the league
+for the process ("nfl" by default, or "ncaaf").
+"""
+import os
+from typing import Dict, NamedTuple, Tuple
+
+REGULAR_SEASON = 2
+POSTSEASON = 3
+
+SITE_API_ROOT = "https://site.api.espn.com/apis/site/v2/sports"
+CORE_API_ROOT = "https://sports.core.api.espn.com/v2/sports"
+
+
+class League(NamedTuple):
+    """
+    One league as the pipeline sees it.
+    """
+
+    key: str
+    # Used in AI prompts and log messages.
+    name: str
+    analyst: str
+    # Path under ESPN's site and core API roots.
+    site_path: str
+    core_path: str
+    # Scoreboard weeks per season type.
+    season_type_weeks: Dict[int, Tuple[int, ...]]
+    # Extra query parameters for the teams list and the weekly scoreboard.
+    team_params: Dict[str, str]
+    scoreboard_params: Dict[str, str]
+    # Season stats summed from the stored boxscores when ESPN_TEAM_STATS=boxscores:
+    # output column -> game metric. Columns left out are read from ESPN's season stats.
+    boxscore_totals: Dict[str, str]
+
+    @property
+    def site_api_base(self) -> str:
+        return f"{SITE_API_ROOT}/{self.site_path}"
+
+    @property
+    def core_api_base(self) -> str:
+        return f"{CORE_API_ROOT}/{self.core_path}"
+
+
+_ALL_BOXSCORE_TOTALS = {
+    "Points_Allowed": "points_allowed",
+    "Turnovers": "takeaways",
+    "Sacks": "sacks",
+    "Interceptions": "interceptions",
+}
+
+LEAGUES = {
+    "nfl": League(
+        key="nfl",
+        name="NFL",
+        analyst="an NFL defensive analyst",
+        site_path="football/nfl",
+        core_path="football/leagues/nfl",
+        # Postseason week 4 is the Pro Bowl, which is skipped.
+        season_type_weeks={REGULAR_SEASON: tuple(range(1, 19)), POSTSEASON: (1, 2, 3, 5)},
+        team_params={"limit": "50"},
+        scoreboard_params={"limit": "100"},
+        boxscore_totals=_ALL_BOXSCORE_TOTALS,
+    ),
+    "ncaaf": League(
+        key="ncaaf",
+        name="college football",
+        analyst="a college football defensive analyst",
+        site_path="football/college-football",
+        core_path="football/leagues/college-football",
+        # Week 16 is Army-Navy; every bowl and playoff game is in postseason week 1.
+        season_type_weeks={REGULAR_SEASON: tuple(range(1, 17)), POSTSEASON: (1,)},
+        # Group 80 is FBS. Without it the lists run to every division.
+        team_params={"limit": "1000", "groups": "80"},
+        scoreboard_params={"limit": "1000", "groups": "80"},
+        # College boxscores have no sacks line, so sacks come from the season stats.
+        boxscore_totals={
+            column: metric for column, metric in _ALL_BOXSCORE_TOTALS.items() if column != "Sacks"
+        },
+    ),
+}
+
+
+def get_league(key: str) -> League:
+    try:
+        return LEAGUES[key.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Unknown league {key!r}; expected one of {', '.join(LEAGUES)}") from None
+
+
+LEAGUE = get_league(os.getenv("ESPN_LEAGUE", "nfl"))
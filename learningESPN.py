@@ -2,71 +2,270 @@
 import datetime
 import json
 import os
+import random
+import shutil
+import threading
 import time
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Set
 
-import openai
-import pandas as pd
-import requests
 from dotenv import load_dotenv
 
+# Load environment variables before the modules below read their settings.
+load_dotenv()
+
+from boxscore_parser import parse_summary_stream, trim_summary  # noqa: E402
+from espn_http import (  # noqa: E402
+    HTTP_SESSION,
+    RATE_LIMITER,
+    RESPONSE_CACHE,
+    HTTPStatusError,
+    RateLimiter,
+    concurrent_map,
+    env_bool,
+    env_float,
+    env_int,
+    retry_after_seconds,
+)
+from export import FORMATS as EXPORT_FORMAT_CHOICES, export_path  # noqa: E402
+from game_calendar import IDLE_POLL_SECONDS, LIVE_POLL_SECONDS, GameCalendar  # noqa: E402
+from game_metrics import GameMatrix, parse_boxscore_teams  # noqa: E402
+from leagues import LEAGUE  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from records import Event, Team, TeamGame, intern_id  # noqa: E402
+from season_state import INCREMENTAL, STATE_DIR, FailureQueue, SummaryCache  # noqa: E402
+from snapshots import SNAPSHOTS  # noqa: E402
+from stat_index import ANY_GROUP, index_stats, load_stat_schema, schema_sources, select_stats  # noqa: E402
+from warehouse import POSTSEASON, REGULAR_SEASON, WAREHOUSE, parse_seasons  # noqa: E402
+
+# Heavy dependencies (openai, requests, ijson, openpyxl) are imported inside the
+# functions that use them, so `import learningESPN` stays cheap for the web app.
+
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-SITE_API_BASE = "https://site.api.espn.com/apis/site/v2/sports/football/nfl"
-CORE_API_BASE = "https://sports.core.api.espn.com/v2/sports/football/leagues/nfl"
+# The league (ESPN_LEAGUE, see leagues.py) sets the API paths and calendar. Base URLs
+# can be pointed at a local fake ESPN server for testing.
+SITE_API_BASE = os.getenv("ESPN_SITE_API_BASE", LEAGUE.site_api_base)
+CORE_API_BASE = os.getenv("ESPN_CORE_API_BASE", LEAGUE.core_api_base)
+# Scoreboard weeks per season type.
+SEASON_TYPE_WEEKS = LEAGUE.season_type_weeks
+# How the season's events are discovered: "scoreboard" (one request per week) or
+# "schedule" (one request per team, every game seen twice).
+EVENT_DISCOVERY = os.getenv("ESPN_EVENT_DISCOVERY", "scoreboard").strip().lower()
 
-# Load environment variables
-load_dotenv()
+AI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+AI_SYSTEM_PROMPT = f"You are {LEAGUE.analyst} providing concise team defensive summaries."
+AI_MAX_CONCURRENCY = env_int("AI_MAX_CONCURRENCY", 4)
+AI_MAX_RETRIES = env_int("AI_MAX_RETRIES", 4)
+# Teams packed into one chat completion; 1 sends one request per team.
+AI_BATCH_SIZE = env_int("AI_BATCH_SIZE", 1)
+AI_RATE_LIMITER = RateLimiter(rate=env_float("AI_RATE_LIMIT", 2.0), burst=env_int("AI_RATE_BURST", 4))
+SUMMARY_CACHE = SummaryCache()
+FAILED_UNITS = FailureQueue()
+# Failed units that leave games missing from the warehouse (vs. season statistics/record).
+GAME_UNIT_KINDS = ("scoreboard", "schedule", "summary")
+RUN_REPORT_PATH = os.path.join(STATE_DIR, "run_report.json")
+EXCEL_FILENAME = f"{LEAGUE.key}_ai_summary.xlsx"
+# Formats written after each run. JSON is the source for converting to other formats on demand.
+EXPORT_FORMATS = [
+    fmt for fmt in (f.strip().lower() for f in os.getenv("EXPORT_FORMATS", "xlsx,json").split(","))
+    if fmt in EXPORT_FORMAT_CHOICES
+] or ["xlsx", "json"]
+
+_openai_clients: Dict[str, "openai.OpenAI"] = {}
+_openai_clients_lock = threading.Lock()
+
+# Games fetched between warehouse commits, and seasons backfilled at once.
+INGEST_CHUNK = env_int("ESPN_INGEST_CHUNK", 64)
+BACKFILL_PARALLEL = env_int("ESPN_BACKFILL_PARALLEL", 2)
+# Where season points allowed, takeaways, sacks and interceptions come from: "boxscores"
+# (summed from the stored games) or "endpoints" (ESPN's season aggregates, up to two
+# requests per team). Extra TEAM_STAT_SCHEMA columns are always read from the endpoints.
+TEAM_STATS_SOURCE = os.getenv("ESPN_TEAM_STATS", "boxscores").strip().lower()
+# Season stats read from ESPN's statistics and record payloads: column -> (source, group,
+# stat). ESPN_STAT_SCHEMA names a JSON file of extra columns to export (see stat_index.py).
+TEAM_STAT_SCHEMA = load_stat_schema(
+    {
+        "Points_Allowed": ("record", ANY_GROUP, "pointsAgainst"),
+        "Turnovers": ("statistics", "miscellaneous", "totalTakeaways"),
+        "Sacks": ("statistics", "defensive", "sacks"),
+        "Interceptions": ("statistics", "defensiveInterceptions", "interceptions"),
+    },
+    os.getenv("ESPN_STAT_SCHEMA"),
+)
+# Output columns every row has; other TEAM_STAT_SCHEMA columns are extras.
+STANDARD_STAT_COLUMNS = ("Points_Allowed", "Turnovers", "Sacks", "Interceptions")
+# Schema columns summed from the stored games when ESPN_TEAM_STATS=boxscores: column -> game metric.
+BOXSCORE_TOTALS = LEAGUE.boxscore_totals
+
+# Parse /summary responses incrementally, keeping only the boxscore team statistics.
+STREAM_SUMMARIES = env_bool("ESPN_STREAM_SUMMARIES", True)
+
+# progress(stage, done, total), reported by the pipeline stages as work completes.
+ProgressCallback = Callable[[str, int, int], None]
 
-def _make_request(url: str, params: Dict[str, str] = None, retries: int = 3, backoff: float = 0.5):
+def _stage_progress(progress: Optional[ProgressCallback], stage: str) -> Optional[Callable[[int, int], None]]:
     """
-    Helper to perform HTTP GET requests with retries and a consistent User-Agent.
-    Returns parsed JSON or raises an exception after exhausting retries.
+    Bind a pipeline progress callback to one stage, for use with `concurrent_map`.
+    """
+    if progress is None:
+        return None
+    return lambda done, total: progress(stage, done, total)
+
+
+def _map_units(
+    kind: str,
+    func: Callable,
+    keys: List,
+    season: int,
+    season_type: int = REGULAR_SEASON,
+    progress: Optional[Callable[[int, int], None]] = None,
+    context: Callable[[object], Dict] = None,
+) -> Dict:
     """
-    last_error = None
-    for attempt in range(1, retries + 1):
+    concurrent_map for independent units of work: a unit that raises is recorded in
+    FAILED_UNITS (with `context(key)`, if given) instead of failing the run, and units
+    that succeed are cleared from it. Units FAILED_UNITS has given up on are skipped.
+    Returns the results of the successful units by key.
+    """
+    given_up = [key for key in keys if FAILED_UNITS.given_up(kind, season, season_type, key)]
+    if given_up:
+        print(f"{season} {kind}: skipping {len(given_up)} unit(s) given up on (see `learningESPN.py failures`).")
+        keys = [key for key in keys if key not in given_up]
+
+    def attempt(key):
         try:
-            response = requests.get(
-                url,
-                params=params,
-                headers={"User-Agent": USER_AGENT},
-                timeout=20,
-            )
-            if response.status_code == 200:
-                return response.json()
-            last_error = RuntimeError(f"HTTP {response.status_code} for {url} params={params}")
+            return True, func(key)
         except Exception as exc:
-            last_error = exc
-        time.sleep(backoff * attempt)
-    raise last_error or RuntimeError(f"Failed to fetch {url}")
+            return False, exc
+
+    results = {}
+    for key, (ok, value) in zip(keys, concurrent_map(attempt, keys, progress=progress)):
+        if ok:
+            results[key] = value
+            FAILED_UNITS.resolve(kind, season, season_type, key)
+        else:
+            retryable = getattr(value, "retryable", True)
+            print(f"{season} {kind} {key} failed, {'queued for the next run' if retryable else 'not retried'}: {value}")
+            FAILED_UNITS.record(
+                kind, season, season_type, key, str(value), context(key) if context else None, retryable=retryable
+            )
+    FAILED_UNITS.save()
+    return results
 
 
-def _extract_stat(categories: List[Dict], category_name: str, stat_name: str, default: float = 0.0) -> float:
+def _make_request(
+    url: str,
+    params: Dict[str, str] = None,
+    retries: int = 3,
+    backoff: float = 0.5,
+    parse: Callable[["requests.Response"], Dict] = None,
+    immutable: bool = False,
+    revalidate: bool = False,
+):
     """
-    Convenience function to extract a stat from the nested ESPN category structure.
+    Helper to perform HTTP GET requests with retries and a consistent User-Agent.
+    Requests go through the shared keep-alive session, and every attempt draws from the
+    shared rate limiter, so concurrent callers stay polite.
+    Fresh responses are served from the on-disk cache; stale ones are revalidated with
+    ETag/Last-Modified so unchanged payloads cost a 304 instead of a full download.
+    Only network errors, 429 and 5xx are retried (honoring Retry-After, otherwise
+    exponential backoff); other 4xx responses raise HTTPStatusError immediately.
+    `parse`, if given, turns a successful streamed response into the payload that is
+    returned and cached, instead of `response.json()`. `immutable` caches the response
+    without expiry, for payloads known never to change. `revalidate` checks even a fresh
+    cached response with ESPN, for polling a payload that is expected to change.
+    Latency, bytes, retries and cache outcome are recorded in METRICS per endpoint.
+    Returns parsed JSON or raises an exception after exhausting retries.
     """
-    for category in categories:
-        if category.get("name") == category_name:
-            for stat in category.get("stats", []):
-                if stat.get("name") == stat_name:
-                    value = stat.get("value")
-                    if value in (None, "", "null"):
-                        return default
-                    try:
-                        return float(value)
-                    except (ValueError, TypeError):
-                        try:
-                            return float(stat.get("displayValue", default).replace(",", ""))
-                        except Exception:
-                            return default
-    return default
+    import requests
+
+    start = time.perf_counter()
+    outcome = {"cache": "miss", "attempts": 0, "bytes": 0, "error": True, "throttled": 0.0}
+    try:
+        cached = RESPONSE_CACHE.get(url, params) if RESPONSE_CACHE else None
+        if cached and cached.fresh and not revalidate:
+            outcome.update(cache="hit", error=False)
+            return cached.payload
+
+        headers = {"User-Agent": USER_AGENT}
+        if cached:
+            headers.update(cached.conditional_headers())
+
+        last_error = None
+        for attempt in range(1, retries + 1):
+            throttle_start = time.perf_counter()
+            RATE_LIMITER.acquire()
+            outcome["throttled"] += time.perf_counter() - throttle_start
+            outcome["attempts"] = attempt
+            delay = backoff * 2 ** (attempt - 1)
+            try:
+                response = HTTP_SESSION.get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    timeout=20,
+                    stream=parse is not None,
+                )
+                if response.status_code == 304 and cached:
+                    outcome["bytes"] += _response_bytes(response)
+                    RESPONSE_CACHE.revalidated(url, params, cached, immutable=immutable)
+                    outcome.update(cache="revalidated", error=False)
+                    return cached.payload
+                if response.status_code == 200:
+                    payload = parse(response) if parse else response.json()
+                    outcome["bytes"] += _response_bytes(response)
+                    if RESPONSE_CACHE:
+                        RESPONSE_CACHE.put(
+                            url,
+                            params,
+                            payload,
+                            etag=response.headers.get("ETag"),
+                            last_modified=response.headers.get("Last-Modified"),
+                            immutable=immutable,
+                        )
+                    outcome["error"] = False
+                    return payload
+                # Drain error bodies so a streamed connection goes back to the pool.
+                outcome["bytes"] += len(response.content)
+                last_error = HTTPStatusError(response.status_code, f"HTTP {response.status_code} for {url} params={params}")
+                if not last_error.retryable:
+                    raise last_error
+                retry_after = retry_after_seconds(response)
+                if retry_after is not None:
+                    delay = retry_after
+            except (requests.RequestException, ValueError) as exc:
+                last_error = exc
+            if attempt < retries:
+                time.sleep(delay)
+        raise last_error or RuntimeError(f"Failed to fetch {url}")
+    finally:
+        # Time spent waiting on the rate limiter is not request latency.
+        METRICS.record_request(
+            url,
+            time.perf_counter() - start - outcome["throttled"],
+            bytes_received=outcome["bytes"],
+            attempts=outcome["attempts"],
+            cache=outcome["cache"],
+            error=outcome["error"],
+        )
+
+
+def _response_bytes(response: "requests.Response") -> int:
+    """
+    Bytes read off the wire for a response whose body has been consumed.
+    """
+    try:
+        return int(response.raw.tell())
+    except (AttributeError, TypeError, ValueError):
+        return len(response.content or b"")
 
 
 def _get_regular_season_year() -> int:
     """
-    Determine the NFL season to query. Defaults to current year, but allows override via env.
-    If we're in the offseason before August and no override is supplied, use previous year.
+    Determine the season to query. Defaults to current year, but allows override via env
+    (ESPN_SEASON, or NFL_SEASON). If we're in the offseason before August and no
+    override is supplied, use previous year.
     """
-    env_override = os.getenv("NFL_SEASON")
+    env_override = os.getenv("ESPN_SEASON") or os.getenv("NFL_SEASON")
     if env_override and env_override.isdigit():
         return int(env_override)
 
@@ -78,173 +277,479 @@ def _get_regular_season_year() -> int:
     return season_year
 
 
-def _get_team_list() -> List[Dict[str, str]]:
+def _get_team_list() -> List[Team]:
     """
-    Retrieve the list of NFL teams with IDs and abbreviations from ESPN.
+    Retrieve the league's teams with IDs and abbreviations from ESPN.
     """
     teams_payload = _make_request(
         f"{SITE_API_BASE}/teams",
-        params={"region": "us", "lang": "en", "limit": "50"},
+        params={"region": "us", "lang": "en", **LEAGUE.team_params},
     )
     teams = []
     for team_entry in teams_payload.get("sports", [{}])[0].get("leagues", [{}])[0].get("teams", []):
         team = team_entry.get("team", {})
         if not team:
             continue
-        teams.append(
-            {
-                "id": team.get("id"),
-                "name": team.get("displayName"),
-                "abbreviation": team.get("abbreviation"),
-            }
-        )
+        teams.append(Team(intern_id(team.get("id")), team.get("displayName"), team.get("abbreviation")))
     return teams
 
 
-def _get_points_allowed(team_id: str, season: int) -> float:
+def _get_season_stat_payload(source: str, team_id: str, season: int) -> Dict:
     """
-    Fetch total points against for a team using the standings/record endpoint.
+    Fetch a team's regular-season "statistics" or "record" payload.
     """
-    record_payload = _make_request(
-        f"{CORE_API_BASE}/seasons/{season}/types/2/teams/{team_id}/record",
-        params={"lang": "en", "region": "us"},
-    )
-    for item in record_payload.get("items", []):
-        for stat in item.get("stats", []):
-            if stat.get("name") == "pointsAgainst":
-                return float(stat.get("value", 0.0))
-    return 0.0
+    params = {"lang": "en", "region": "us"}
+    if source == "statistics":
+        params["contentorigin"] = "espn"
+    return _make_request(f"{CORE_API_BASE}/seasons/{season}/types/2/teams/{team_id}/{source}", params=params)
 
 
-def _get_defensive_stats(team_id: str, season: int) -> Dict[str, float]:
+def _competitor_score(competitor: Dict) -> Optional[int]:
     """
-    Pull defensive categories for sacks, interceptions, and takeaways.
+    A competitor's score: a string on scoreboard payloads, an object on schedules.
     """
-    stats_payload = _make_request(
-        f"{CORE_API_BASE}/seasons/{season}/types/2/teams/{team_id}/statistics",
-        params={"lang": "en", "region": "us", "contentorigin": "espn"},
-    )
-    categories = stats_payload.get("splits", {}).get("categories", [])
-
-    sacks = _extract_stat(categories, "defensive", "sacks", default=0.0)
-    interceptions = _extract_stat(categories, "defensiveInterceptions", "interceptions", default=0.0)
-    takeaways = _extract_stat(categories, "miscellaneous", "totalTakeaways", default=0.0)
-
-    return {
-        "Sacks": sacks,
-        "Interceptions": interceptions,
-        "Turnovers": takeaways,
-    }
+    score = competitor.get("score")
+    if isinstance(score, dict):
+        score = score.get("value", score.get("displayValue"))
+    try:
+        return int(float(score))
+    except (TypeError, ValueError):
+        return None
 
 
-def _build_event_team_map(team_ids: List[str], season: int) -> Dict[str, List[str]]:
+def _index_events(payloads: List[Dict]) -> Dict[str, Event]:
     """
-    Build a mapping from event id to the participating team ids for the given season.
+    Map each event id in schedule/scoreboard payloads to an Event with its participating
+    team ids, completion status, week, date and scores. Later payloads overwrite earlier
+    entries for the same event.
     """
-    event_map: Dict[str, List[str]] = {}
-    for idx, team_id in enumerate(team_ids, start=1):
-        schedule_payload = _make_request(
-            f"{SITE_API_BASE}/teams/{team_id}/schedule",
-            params={"season": season, "seasontype": 2},
-        )
-        for event in schedule_payload.get("events", []):
+    event_index: Dict[str, Event] = {}
+    for payload in payloads:
+        payload_week = (payload.get("week") or {}).get("number")
+        for event in payload.get("events", []):
             event_id = event.get("id")
             competitions = event.get("competitions", [])
             if not competitions:
                 continue
-            competitors = competitions[0].get("competitors", [])
-            event_map[event_id] = [c.get("team", {}).get("id") for c in competitors if c.get("team")]
+            competitors = [c for c in competitions[0].get("competitors", []) if c.get("team")]
+            status = competitions[0].get("status") or event.get("status") or {}
+            event_index[intern_id(event_id)] = Event(
+                teams=tuple(intern_id(c["team"].get("id")) for c in competitors),
+                completed=bool(status.get("type", {}).get("completed")),
+                week=(event.get("week") or {}).get("number", payload_week),
+                date=event.get("date"),
+                scores=tuple(_competitor_score(c) for c in competitors),
+            )
+    return event_index
+
 
-        if idx % 5 == 0:
-            time.sleep(0.5)
-    return event_map
+def _build_event_index_from_schedules(
+    team_ids: List[str], season: int, progress: ProgressCallback = None, season_type: int = REGULAR_SEASON
+) -> Dict[str, Event]:
+    """
+    Discover events by crawling every team's schedule (one request per team). Failed
+    schedules are queued in FAILED_UNITS.
+    """
+    schedules = _map_units(
+        "schedule",
+        lambda team_id: _make_request(
+            f"{SITE_API_BASE}/teams/{team_id}/schedule",
+            params={"season": season, "seasontype": season_type},
+        ),
+        team_ids,
+        season,
+        season_type,
+        progress=_stage_progress(progress, "events"),
+    )
+    return _index_events(list(schedules.values()))
 
 
-def _compute_yards_allowed(team_ids: List[str], season: int) -> Dict[str, int]:
+def _build_event_index_from_scoreboard(
+    season: int, progress: ProgressCallback = None, season_type: int = REGULAR_SEASON
+) -> Dict[str, Event]:
     """
-    Aggregate total yards allowed per team by iterating through each game's boxscore.
+    Discover events from the league scoreboard (one request per week, each game seen
+    once). Failed weeks are queued in FAILED_UNITS.
     """
-    yards_allowed = {team_id: 0 for team_id in team_ids}
-    event_map = _build_event_team_map(team_ids, season)
+    scoreboards = _map_units(
+        "scoreboard",
+        lambda week: _make_request(
+            f"{SITE_API_BASE}/scoreboard",
+            params={"dates": season, "seasontype": season_type, "week": week, **LEAGUE.scoreboard_params},
+        ),
+        list(SEASON_TYPE_WEEKS[season_type]),
+        season,
+        season_type,
+        progress=_stage_progress(progress, "events"),
+    )
+    return _index_events(list(scoreboards.values()))
 
-    for processed_count, (event_id, participants) in enumerate(event_map.items(), start=1):
-        if not participants or len(participants) != 2:
-            continue
 
-        summary_payload = _make_request(
-            f"{SITE_API_BASE}/summary",
-            params={"event": event_id},
+def _build_event_index(
+    team_ids: List[str],
+    season: int,
+    strategy: str = None,
+    progress: ProgressCallback = None,
+    season_type: int = REGULAR_SEASON,
+) -> Dict[str, Event]:
+    """
+    Map each event id of the season to its Event (participating team ids, completion
+    status, week, date and scores), using the configured discovery strategy.
+    """
+    strategy = strategy or EVENT_DISCOVERY
+    if strategy == "schedule":
+        return _build_event_index_from_schedules(team_ids, season, progress, season_type)
+    if strategy == "scoreboard":
+        return _build_event_index_from_scoreboard(season, progress, season_type)
+    raise ValueError(f"Unknown event discovery strategy: {strategy!r}")
+
+
+def _game_rows(event_id: str, info: Event, season: int, season_type: int, summary_payload: Dict) -> List[TeamGame]:
+    """
+    One warehouse row per team for a completed game, with what that team's defense
+    allowed. Returns no rows if the boxscore is incomplete.
+    """
+    gained = parse_boxscore_teams(summary_payload.get("boxscore", {}).get("teams", []))
+    if not gained:
+        return []
+    rows = []
+    for team_id, opponent_id in (list(gained), list(gained)[::-1]):
+        opponent = gained[opponent_id]
+        rows.append(
+            TeamGame(
+                event_id=event_id,
+                team_id=intern_id(team_id),
+                opponent_id=intern_id(opponent_id),
+                season=season,
+                season_type=season_type,
+                week=info.week,
+                points_allowed=info.score(opponent_id),
+                yards_allowed=opponent["yards"],
+                passing_yards_allowed=opponent["passing_yards"],
+                rushing_yards_allowed=opponent["rushing_yards"],
+                takeaways=opponent["turnovers"],
+                sacks=opponent["sacked"],
+                interceptions=opponent["interceptions_thrown"],
+            )
         )
-        teams = summary_payload.get("boxscore", {}).get("teams", [])
-        if len(teams) != 2:
-            continue
+    return rows
 
-        team_totals = {}
-        for team_entry in teams:
-            team_info = team_entry.get("team", {})
-            tid = team_info.get("id")
-            yards_total = 0
-            for stat in team_entry.get("statistics", []):
-                if stat.get("name") == "totalYards":
-                    raw_value = stat.get("displayValue") or stat.get("value")
-                    try:
-                        yards_total = int(str(raw_value).replace(",", ""))
-                    except (ValueError, TypeError):
-                        yards_total = 0
-                    break
-            if tid:
-                team_totals[tid] = yards_total
 
-        if len(team_totals) == 2:
-            tid_a, tid_b = list(team_totals.keys())
-            yards_allowed[tid_a] += team_totals[tid_b]
-            yards_allowed[tid_b] += team_totals[tid_a]
+class IncompleteBoxscoreError(RuntimeError):
+    """
+    A /summary response without statistics for both teams. Not retried within a run;
+    the game is queued in FAILED_UNITS instead.
+    """
 
-        if processed_count % 25 == 0:
-            time.sleep(0.5)
 
-    return yards_allowed
+def _check_boxscore(payload: Dict) -> Dict:
+    if not parse_boxscore_teams(payload.get("boxscore", {}).get("teams", [])):
+        raise IncompleteBoxscoreError("incomplete boxscore")
+    return payload
 
 
-def fetch_nfl_defensive_stats():
+def _parse_summary_response(response: "requests.Response") -> Dict:
     """
-    Fetches NFL defensive statistics from ESPN APIs.
-    Returns a list of dictionaries with team defensive stats.
+    Reduce a /summary response to its boxscore team statistics, parsing the body as it
+    streams in unless ESPN_STREAM_SUMMARIES=0. A body cut short raises requests'
+    ChunkedEncodingError either way, so it is retried. Raises IncompleteBoxscoreError,
+    so the response is not cached, unless both teams' statistics are there.
     """
+    if not STREAM_SUMMARIES:
+        return _check_boxscore(trim_summary(response.json()))
+    import ijson
+    import requests
+    import urllib3
+
+    response.raw.decode_content = True
     try:
-        season = _get_regular_season_year()
-        teams = _get_team_list()
-        if not teams:
-            raise RuntimeError("Unable to retrieve NFL teams from ESPN.")
+        payload = parse_summary_stream(response.raw)
+        # Parsing stops at the boxscore; discard the rest unparsed so the connection can be reused.
+        for _ in response.iter_content(chunk_size=65536):
+            pass
+    except (urllib3.exceptions.HTTPError, ijson.JSONError) as exc:
+        # Reading response.raw bypasses requests' own wrapping of a body cut short; wrap it
+        # the same way so _make_request retries it like the non-streamed path.
+        raise requests.exceptions.ChunkedEncodingError(exc) from exc
+    return _check_boxscore(payload)
 
-        print(f"Using NFL season {season}. Found {len(teams)} teams. Fetching defensive stats...")
 
-        team_ids = [team["id"] for team in teams]
-        yards_allowed_map = _compute_yards_allowed(team_ids, season)
+def _get_event_summary(event_id: str) -> Dict:
+    """
+    Fetch the boxscore of a completed game. Final boxscores never change, so they are
+    cached without expiry.
+    """
+    url, params = f"{SITE_API_BASE}/summary", {"event": event_id}
+    payload = _make_request(url, params=params, parse=_parse_summary_response, immutable=True)
+    try:
+        return _check_boxscore(payload)
+    except IncompleteBoxscoreError:
+        # Cached before incomplete boxscores were refused; drop it so the retry reaches ESPN.
+        if RESPONSE_CACHE:
+            RESPONSE_CACHE.delete(url, params)
+        raise
 
-        teams_data = []
-        for idx, team in enumerate(teams, start=1):
-            team_id = team["id"]
-            stats = _get_defensive_stats(team_id, season)
-            points_allowed = _get_points_allowed(team_id, season)
-            yards_allowed = yards_allowed_map.get(team_id, 0)
 
-            teams_data.append(
+def _ingest_games(
+    event_index: Dict[str, Event], season: int, season_type: int, progress: ProgressCallback = None
+) -> Dict[str, int]:
+    """
+    Fetch the boxscores of completed games not yet in the warehouse and store their
+    per-team rows. Games are committed in chunks of INGEST_CHUNK, so an interrupted
+    run resumes where it stopped. Games whose summary fails (including one without a
+    full boxscore, see `_get_event_summary`) are queued in FAILED_UNITS with their
+    event info and retried on the next run even if discovery misses them, until
+    FAILED_UNITS gives up on them. The season
+    type is only checkpointed as complete once none of its games or discovery
+    requests are left in the queue. Returns counts of completed, new, stored and
+    failed games.
+    """
+    queued = {
+        intern_id(entry["key"]): Event.from_context(entry["context"])
+        for entry in FAILED_UNITS.pending(season, season_type, kinds=("summary",), retrying=True)
+        if entry.get("context")
+    }
+    event_index = {**queued, **event_index}
+    completed = [
+        event_id for event_id, info in event_index.items() if info.completed and len(info.teams) == 2
+    ]
+    ingested = WAREHOUSE.ingested_events(season, season_type) if INCREMENTAL else set()
+    for event_id in ingested.intersection(queued):
+        FAILED_UNITS.resolve("summary", season, season_type, event_id)
+    new_event_ids = [
+        event_id for event_id in completed
+        if event_id not in ingested and not FAILED_UNITS.given_up("summary", season, season_type, event_id)
+    ]
+    print(
+        f"{season} season type {season_type}: {len(new_event_ids)} newly completed games to process "
+        f"({len(completed) - len(new_event_ids)} already stored)."
+    )
+
+    stored = 0
+    for offset in range(0, len(new_event_ids), INGEST_CHUNK):
+        chunk = new_event_ids[offset:offset + INGEST_CHUNK]
+        chunk_progress = None
+        if progress:
+            chunk_progress = lambda done, total, offset=offset: progress("boxscores", offset + done, len(new_event_ids))
+        summaries = _map_units(
+            "summary", _get_event_summary, chunk, season, season_type,
+            progress=chunk_progress, context=lambda event_id: event_index[event_id].to_context(),
+        )
+
+        games, rows = [], []
+        for event_id, summary_payload in summaries.items():
+            info = event_index[event_id]
+            games.append(
                 {
-                    "Team": team["name"],
-                    "Abbreviation": team["abbreviation"],
-                    "Team_ID": team_id,
-                    "Points_Allowed": int(points_allowed),
-                    "Yards_Allowed": int(yards_allowed),
-                    "Turnovers": int(stats.get("Turnovers", 0)),
-                    "Sacks": int(stats.get("Sacks", 0)),
-                    "Interceptions": int(stats.get("Interceptions", 0)),
+                    "event_id": event_id,
+                    "season": season,
+                    "season_type": season_type,
+                    "week": info.week,
+                    "date": info.date,
+                    "boxscore": summary_payload.get("boxscore", {}).get("teams", []),
                 }
             )
+            rows.extend(_game_rows(event_id, info, season, season_type, summary_payload))
+        WAREHOUSE.put_games(games, rows)
+        FAILED_UNITS.save()
+        stored += len(games)
+
+    all_stored = len(completed) - len(new_event_ids) + stored
+    failed = FAILED_UNITS.pending(season, season_type, kinds=GAME_UNIT_KINDS)
+    WAREHOUSE.set_checkpoint(
+        season,
+        season_type,
+        events=len(event_index),
+        ingested=all_stored,
+        complete=bool(event_index) and not failed and all_stored == len(completed) == len(event_index),
+    )
+    return {"completed": len(completed), "new": len(new_event_ids), "stored": stored, "failed": len(failed)}
+
+
+def _update_season_games(team_ids: List[str], season: int, progress: ProgressCallback = None) -> None:
+    """
+    Bring the warehouse up to date with the season's completed regular-season games.
+    Only games that went final since the last run are fetched.
+    """
+    with METRICS.stage("events"):
+        event_index = _build_event_index(team_ids, season, progress=progress)
+
+    with METRICS.stage("boxscores"):
+        _ingest_games(event_index, season, REGULAR_SEASON, progress)
+
+
+def _with_game_metrics(teams_data: List[Dict], metrics: Dict[str, Dict[str, float]]) -> List[Dict]:
+    """
+    Add the per-game metrics computed from the season's boxscores to each team row.
+    """
+    for row in teams_data:
+        team = metrics.get(row["Team_ID"], {})
+        row.update(
+            {
+                "Passing_Yards_Allowed": int(team.get("passing_yards_allowed", 0)),
+                "Rushing_Yards_Allowed": int(team.get("rushing_yards_allowed", 0)),
+                "Points_Allowed_Per_Game": team.get("points_allowed_per_game", 0.0),
+                "Yards_Allowed_Per_Game": team.get("yards_allowed_per_game", 0.0),
+                "Third_Down_Pct_Allowed": team.get("third_down_pct_allowed", 0.0),
+                "Red_Zone_TD_Pct_Allowed": team.get("red_zone_pct_allowed", 0.0),
+                "Recent_Points_Allowed_Per_Game": team.get("recent_points_allowed_per_game", 0.0),
+                "Recent_Yards_Allowed_Per_Game": team.get("recent_yards_allowed_per_game", 0.0),
+            }
+        )
+    return teams_data
+
+
+def _mark_incomplete(teams_data: List[Dict], season: int) -> List[Dict]:
+    """
+    Add Data_Complete and Missing_Data to each row, from the season's regular-season
+    units still in FAILED_UNITS. A failed scoreboard week affects every team.
+    """
+    everyone: List[str] = []
+    missing: Dict[str, List[str]] = {}
+    for entry in FAILED_UNITS.pending(season, REGULAR_SEASON):
+        kind, key = entry["kind"], entry["key"]
+        if kind == "scoreboard":
+            everyone.append(f"week {key} scoreboard")
+        elif kind == "summary":
+            for team_id in (entry.get("context") or {}).get("teams", []):
+                missing.setdefault(team_id, []).append(f"game {key}")
+        else:
+            # schedule, statistics and record units are keyed by team id.
+            missing.setdefault(key, []).append(kind)
+    for row in teams_data:
+        reasons = everyone + missing.get(row["Team_ID"], [])
+        row["Data_Complete"] = not reasons
+        row["Missing_Data"] = ", ".join(reasons)
+    return teams_data
+
+
+def _extra_stat_columns() -> List[str]:
+    """
+    TEAM_STAT_SCHEMA columns beyond the standard output columns.
+    """
+    return [column for column in TEAM_STAT_SCHEMA if column not in STANDARD_STAT_COLUMNS]
+
+
+def _get_team_season_rows(
+    teams: List[Team], season: int, progress: ProgressCallback = None, only_teams: Set[str] = None
+) -> List[Dict]:
+    """
+    Build one output row per team from the season's stored games, plus any
+    TEAM_STAT_SCHEMA columns the games can't supply. With ESPN_TEAM_STATS=endpoints,
+    every schema column is read from ESPN's season aggregates instead. Each team's
+    statistics and record payloads are fetched once; one that fails is queued in
+    FAILED_UNITS and its columns fall back to the game totals (or 0). With
+    `only_teams`, other teams reuse the columns stored in the warehouse when it has
+    them all, so only those teams' payloads are fetched.
+    """
+    with METRICS.stage("team_stats"):
+        metrics = GameMatrix.load(season).season_metrics()
+        team_ids = [team.id for team in teams]
+        if TEAM_STATS_SOURCE == "endpoints":
+            endpoint_columns = list(TEAM_STAT_SCHEMA)
+        else:
+            endpoint_columns = [column for column in TEAM_STAT_SCHEMA if column not in BOXSCORE_TOTALS]
+        sources = schema_sources(TEAM_STAT_SCHEMA, endpoint_columns) if endpoint_columns else ()
+        reused = {}
+        if only_teams is not None and sources:
+            queued = {entry["key"] for entry in FAILED_UNITS.pending(season, REGULAR_SEASON, kinds=sources)}
+            reused = {
+                row["Team_ID"]: row for row in WAREHOUSE.team_seasons(season)
+                if row["Team_ID"] not in only_teams and row["Team_ID"] not in queued
+                and all(column in row for column in endpoint_columns)
+            }
+        indexes = {
+            source: _map_units(
+                source,
+                lambda team_id, source=source: index_stats(_get_season_stat_payload(source, team_id, season)),
+                [team_id for team_id in team_ids if team_id not in reused],
+                season,
+                progress=_stage_progress(progress, "team_stats"),
+            )
+            for source in sources
+        }
+        if not sources and progress:
+            progress("team_stats", len(team_ids), len(team_ids))
 
-            if idx % 5 == 0:
-                time.sleep(0.5)
+    teams_data = []
+    for team in teams:
+        team_id = team.id
+        game_totals = metrics.get(team_id, {})
+        team_indexes = {source: results[team_id] for source, results in indexes.items() if team_id in results}
+        if team_id in reused:
+            stats = {column: reused[team_id][column] for column in endpoint_columns}
+        else:
+            stats = select_stats(
+                team_indexes,
+                {column: TEAM_STAT_SCHEMA[column] for column in endpoint_columns if TEAM_STAT_SCHEMA[column][0] in team_indexes},
+            )
+        values = {
+            column: stats[column] if column in stats else game_totals.get(BOXSCORE_TOTALS.get(column), 0)
+            for column in TEAM_STAT_SCHEMA
+        }
+        row = {
+            "Team": team.name,
+            "Abbreviation": team.abbreviation,
+            "Team_ID": team_id,
+            "Points_Allowed": int(values.pop("Points_Allowed")),
+            "Yards_Allowed": int(game_totals.get("yards_allowed", 0)),
+            "Turnovers": int(values.pop("Turnovers")),
+            "Sacks": int(values.pop("Sacks")),
+            "Interceptions": int(values.pop("Interceptions")),
+        }
+        # Extra schema columns, whole numbers as ints.
+        row.update({column: int(value) if float(value).is_integer() else value for column, value in values.items()})
+        teams_data.append(row)
+    return _with_game_metrics(teams_data, metrics)
 
+
+def fetch_nfl_defensive_stats(progress: ProgressCallback = None, season: int = None, only_teams: Set[str] = None):
+    """
+    Fetches defensive statistics for the league's teams (ESPN_LEAGUE) from ESPN APIs.
+    Returns a list of dictionaries with team defensive stats.
+    A season whose regular season is fully stored in the warehouse (with every stat
+    schema column) is read from there without any ESPN requests. With `only_teams`,
+    only those teams' season stats are re-fetched (see `_get_team_season_rows`).
+    Requests that fail are queued in FAILED_UNITS and retried on the next run, and
+    the rows they affect are marked incomplete. Other errors are raised.
+    `progress(stage, done, total)` is called as each stage makes headway.
+    """
+    try:
+        season = season or _get_regular_season_year()
+        if INCREMENTAL and WAREHOUSE.is_complete(season, REGULAR_SEASON) and not FAILED_UNITS.pending(season):
+            stored = WAREHOUSE.team_seasons(season)
+            # Rows stored before a stat schema column was added are rebuilt.
+            if stored and all(column in stored[0] for column in _extra_stat_columns()):
+                print(f"Using {LEAGUE.name} season {season} from the warehouse ({len(stored)} teams).")
+                return _mark_incomplete(_with_game_metrics(stored, GameMatrix.load(season).season_metrics()), season)
+
+        if progress:
+            progress("teams", 0, 1)
+        with METRICS.stage("teams"):
+            teams = _get_team_list()
+        if not teams:
+            raise RuntimeError(f"Unable to retrieve {LEAGUE.name} teams from ESPN.")
+
+        print(f"Using {LEAGUE.name} season {season}. Found {len(teams)} teams. Fetching defensive stats...")
+
+        _update_season_games([team.id for team in teams], season, progress)
+        teams_data = _get_team_season_rows(teams, season, progress, only_teams)
+        WAREHOUSE.put_team_seasons(season, teams_data, extra_columns=_extra_stat_columns())
+        _mark_incomplete(teams_data, season)
+
+        connections = HTTP_SESSION.connection_stats()
+        print(
+            f"ESPN connections: {connections['connections_opened']} opened, "
+            f"{connections['connections_reused']} reused over {connections['requests']} requests."
+        )
+        incomplete = sum(not row["Data_Complete"] for row in teams_data)
+        if incomplete:
+            queued = FAILED_UNITS.pending(season)
+            given_up = sum(entry["given_up"] for entry in queued)
+            print(
+                f"{incomplete} of {len(teams_data)} teams are missing data from failed requests; "
+                f"{len(queued) - given_up} failed request(s) will be retried on the next run, {given_up} given up on."
+            )
         return teams_data
 
     except Exception as e:
@@ -252,24 +757,214 @@ def fetch_nfl_defensive_stats():
         import traceback
 
         traceback.print_exc()
-        # Return fallback template to keep downstream processing functional.
-        return [
-            {
-                "Team": "Unknown Team",
-                "Abbreviation": "UNK",
-                "Team_ID": "0",
-                "Points_Allowed": 0,
-                "Yards_Allowed": 0,
-                "Turnovers": 0,
-                "Sacks": 0,
-                "Interceptions": 0,
-            }
-        ]
+        # No placeholder rows: a failed run must not replace the last good snapshot.
+        raise
+
+
+def _backfill_season(season: int, teams: List[Team], season_types: List[int], force: bool = False) -> Dict:
+    """
+    Ingest every completed game of `season` for each season type, then store the
+    regular-season team totals. Season types already checkpointed as complete are
+    skipped unless `force` is set.
+    """
+    result = {"season": season}
+    team_ids = [team.id for team in teams]
+    for season_type in season_types:
+        if not force and WAREHOUSE.is_complete(season, season_type):
+            result[season_type] = "skipped"
+            continue
+        event_index = _build_event_index(team_ids, season, season_type=season_type)
+        result[season_type] = _ingest_games(event_index, season, season_type)
+
+    regular_season_changed = (
+        result.get(REGULAR_SEASON) != "skipped"
+        or not WAREHOUSE.team_seasons(season)
+        or FAILED_UNITS.pending(season, REGULAR_SEASON, kinds=("statistics", "record"))
+    )
+    if REGULAR_SEASON in season_types and regular_season_changed:
+        WAREHOUSE.put_team_seasons(season, _get_team_season_rows(teams, season), extra_columns=_extra_stat_columns())
+    return result
+
+
+def backfill_seasons(
+    seasons: List[int], postseason: bool = True, parallel: int = None, force: bool = False
+) -> List[Dict]:
+    """
+    Load historical seasons into the warehouse, BACKFILL_PARALLEL seasons at a time.
+    Progress is checkpointed per chunk of games, so rerunning after an interruption
+    only fetches what is missing. A season that fails is reported and left for the
+    next run; the others carry on.
+    """
+    season_types = [REGULAR_SEASON, POSTSEASON] if postseason else [REGULAR_SEASON]
+    with METRICS.stage("teams"):
+        teams = _get_team_list()
+    if not teams:
+        raise RuntimeError(f"Unable to retrieve {LEAGUE.name} teams from ESPN.")
+
+    def run(season: int) -> Dict:
+        start = time.perf_counter()
+        try:
+            result = _backfill_season(season, teams, season_types, force)
+        except Exception as exc:
+            result = {"season": season, "error": str(exc)}
+        result["seconds"] = round(time.perf_counter() - start, 2)
+        print(f"Backfill {season}: {result}")
+        return result
 
+    with METRICS.stage("backfill"):
+        return concurrent_map(run, seasons, max_workers=parallel or BACKFILL_PARALLEL)
 
-def get_ai_defensive_summary(team_data):
+
+def _build_summary_prompt(team_data: Dict) -> str:
+    """
+    Build the user prompt describing one team's defensive numbers.
+    """
+    points_allowed = team_data.get('Points_Allowed', 'N/A')
+    yards_allowed = team_data.get('Yards_Allowed', 'N/A')
+    turnovers = team_data.get('Turnovers', 'N/A')
+    sacks = team_data.get('Sacks', 'N/A')
+    interceptions = team_data.get('Interceptions', 'N/A')
+
+    # Convert numeric values to strings for the prompt
+    def format_stat(value):
+        if value == 0 or value == 'N/A' or value is None:
+            return 'N/A'
+        try:
+            return str(int(value))
+        except:
+            return str(value)
+
+    return f"""Analyze the following {LEAGUE.name} team defensive statistics and provide a brief 2-3 sentence summary of their defensive performance this season.
+
+Team: {team_data.get('Team', 'Unknown')}
+Points Allowed: {format_stat(points_allowed)}
+Yards Allowed: {format_stat(yards_allowed)}
+Turnovers: {format_stat(turnovers)}
+Sacks: {format_stat(sacks)}
+Interceptions: {format_stat(interceptions)}
+Players to watch: {team_data.get('Players to watch', 'N/A')}
+
+Provide a concise defensive analysis:"""
+
+
+def _build_batch_prompt(teams: List[Dict]) -> str:
+    """
+    Build one user prompt covering several teams, asking for a JSON reply keyed by team id.
+    """
+    def stat(team, name):
+        value = team.get(name)
+        return None if value in (0, 'N/A', '') else value
+
+    blocks = [
+        {
+            "team_id": str(team.get('Team_ID')),
+            "team": team.get('Team', 'Unknown'),
+            "points_allowed": stat(team, 'Points_Allowed'),
+            "yards_allowed": stat(team, 'Yards_Allowed'),
+            "turnovers": stat(team, 'Turnovers'),
+            "sacks": stat(team, 'Sacks'),
+            "interceptions": stat(team, 'Interceptions'),
+        }
+        for team in teams
+    ]
+    return f"""Analyze the following {LEAGUE.name} teams' defensive statistics. For each team, provide a brief 2-3 sentence summary of their defensive performance this season. Null means the stat is not available.
+
+Respond with a JSON object of the form {{"summaries": [{{"team_id": "...", "summary": "..."}}]}} containing exactly one entry per team.
+
+Teams:
+{json.dumps(blocks, indent=2)}"""
+
+
+class AiUsage:
+    """
+    Request and token counts accumulated over one summary run.
+    """
+
+    __slots__ = ("requests", "prompt_tokens", "completion_tokens", "_lock")
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, response) -> None:
+        usage = getattr(response, "usage", None)
+        with self._lock:
+            self.requests += 1
+            if usage is not None:
+                self.prompt_tokens += usage.prompt_tokens or 0
+                self.completion_tokens += usage.completion_tokens or 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+        }
+
+
+def _get_openai_client(api_key: str) -> "openai.OpenAI":
+    """
+    Return the shared OpenAI client for `api_key`, creating it on first use.
+    The client's own retries are disabled; `_create_chat_completion` handles 429s.
+    Honors OPENAI_BASE_URL, so a local stub of the API can stand in for OpenAI.
+    """
+    import openai
+
+    with _openai_clients_lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            client = openai.OpenAI(api_key=api_key, max_retries=0)
+            _openai_clients[api_key] = client
+        return client
+
+
+def _retry_after_seconds(error: Exception, attempt: int) -> float:
+    """
+    Seconds to wait before retrying a rate-limited call: the server's Retry-After if
+    given, otherwise exponential backoff with jitter.
+    """
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        return min(30.0, 2 ** (attempt - 1)) + random.uniform(0, 0.5)
+
+
+def _create_chat_completion(client: "openai.OpenAI", messages: List[Dict], **kwargs):
+    """
+    Call the chat completions endpoint under the shared AI rate limit, retrying
+    429 and 5xx responses up to AI_MAX_RETRIES times. Each attempt is recorded in METRICS.
+    """
+    import openai
+
+    for attempt in range(1, AI_MAX_RETRIES + 2):
+        AI_RATE_LIMITER.acquire()
+        start = time.perf_counter()
+        try:
+            response = client.chat.completions.create(model=AI_MODEL, messages=messages, **kwargs)
+        except (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError) as exc:
+            outcome = "rate_limited" if isinstance(exc, openai.RateLimitError) else "error"
+            METRICS.record_ai_call(time.perf_counter() - start, outcome)
+            if attempt > AI_MAX_RETRIES:
+                raise
+            time.sleep(_retry_after_seconds(exc, attempt))
+        except Exception:
+            METRICS.record_ai_call(time.perf_counter() - start, "error")
+            raise
+        else:
+            METRICS.record_ai_call(time.perf_counter() - start, usage=getattr(response, "usage", None))
+            return response
+
+
+def get_ai_defensive_summary(team_data, usage: AiUsage = None):
     """
     Uses OpenAI to generate a defensive summary for a team.
+    Summaries are cached by prompt, so unchanged stats are not sent to the model again.
+    Requests and tokens are added to `usage` when given.
     """
     api_key = os.getenv("OPENAI_API_KEY")
     
@@ -281,42 +976,23 @@ def get_ai_defensive_summary(team_data):
     api_key = api_key.strip()
     if not api_key.startswith("sk-"):
         return f"AI summary error: Invalid API key format. API key should start with 'sk-'. Current key starts with: '{api_key[:5] if len(api_key) >= 5 else api_key}'"
-    
-    try:
-        # Create a prompt for the AI
-        points_allowed = team_data.get('Points_Allowed', 'N/A')
-        yards_allowed = team_data.get('Yards_Allowed', 'N/A')
-        turnovers = team_data.get('Turnovers', 'N/A')
-        sacks = team_data.get('Sacks', 'N/A')
-        interceptions = team_data.get('Interceptions', 'N/A')
-        
-        # Convert numeric values to strings for the prompt
-        def format_stat(value):
-            if value == 0 or value == 'N/A' or value is None:
-                return 'N/A'
-            try:
-                return str(int(value))
-            except:
-                return str(value)
-        
-        prompt = f"""Analyze the following NFL team defensive statistics and provide a brief 2-3 sentence summary of their defensive performance this season.
 
-Team: {team_data.get('Team', 'Unknown')}
-Points Allowed: {format_stat(points_allowed)}
-Yards Allowed: {format_stat(yards_allowed)}
-Turnovers: {format_stat(turnovers)}
-Sacks: {format_stat(sacks)}
-Interceptions: {format_stat(interceptions)}
-Players to watch: {team_data.get('Players to watch', 'N/A')}
+    # Create a prompt for the AI
+    prompt = _build_summary_prompt(team_data)
+    cache_key = SummaryCache.key(AI_MODEL, AI_SYSTEM_PROMPT, prompt)
+    cached_summary = SUMMARY_CACHE.get(cache_key)
+    if cached_summary is not None:
+        return cached_summary
 
-Provide a concise defensive analysis:"""
+    import openai
 
+    try:
         # Initialize OpenAI client with proper error handling
         # The OpenAI client validates the API key format on initialization
         try:
             # Remove any whitespace, newlines, or quotes that might have been accidentally included
             api_key_clean = api_key.strip().strip('"').strip("'")
-            client = openai.OpenAI(api_key=api_key_clean)
+            client = _get_openai_client(api_key_clean)
         except ValueError as ve:
             # This catches format validation errors
             error_msg = str(ve)
@@ -330,16 +1006,18 @@ Provide a concise defensive analysis:"""
             return f"AI client error: {error_msg}"
         
         try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            response = _create_chat_completion(
+                client,
                 messages=[
-                    {"role": "system", "content": "You are an NFL defensive analyst providing concise team defensive summaries."},
+                    {"role": "system", "content": AI_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=150,
                 temperature=0.7,
                 timeout=30.0  # Add timeout to prevent hanging
             )
+            if usage is not None:
+                usage.add(response)
         except Exception as api_call_error:
             error_msg = str(api_call_error)
             if "pattern" in error_msg.lower() or "match" in error_msg.lower():
@@ -347,7 +1025,9 @@ Provide a concise defensive analysis:"""
             raise  # Re-raise if it's a different error
         
         if response and response.choices and len(response.choices) > 0:
-            return response.choices[0].message.content.strip()
+            summary = response.choices[0].message.content.strip()
+            SUMMARY_CACHE.put(cache_key, summary)
+            return summary
         else:
             return "AI summary error: Empty response from OpenAI"
     
@@ -363,14 +1043,201 @@ Provide a concise defensive analysis:"""
         return f"AI summary error: {error_msg}"
 
 
-def fetch_and_save_nfl():
+def _summary_cache_key(team_data: Dict) -> str:
+    return SummaryCache.key(AI_MODEL, AI_SYSTEM_PROMPT, _build_summary_prompt(team_data))
+
+
+def _summarize_batch(client: "openai.OpenAI", teams: List[Dict], usage: AiUsage) -> Dict[str, str]:
     """
-    Main function: Fetches NFL defensive stats from ESPN, generates AI summaries,
-    and saves everything to an Excel file.
+    Summarize several teams in one request. Returns summaries by team id for every
+    entry that parsed; teams missing from the result are left to the caller.
     """
+    response = _create_chat_completion(
+        client,
+        messages=[
+            {"role": "system", "content": f"{AI_SYSTEM_PROMPT} Reply with a JSON object only."},
+            {"role": "user", "content": _build_batch_prompt(teams)},
+        ],
+        max_tokens=150 * len(teams) + 50,
+        temperature=0.7,
+        timeout=60.0,
+        response_format={"type": "json_object"},
+    )
+    usage.add(response)
+    if not response or not response.choices:
+        return {}
+
+    parsed = json.loads(response.choices[0].message.content or "{}")
+    summaries = {}
+    for entry in parsed.get("summaries", []) if isinstance(parsed, dict) else []:
+        if not isinstance(entry, dict):
+            continue
+        summary = entry.get("summary")
+        if entry.get("team_id") is not None and isinstance(summary, str) and summary.strip():
+            summaries[str(entry["team_id"])] = summary.strip()
+    return summaries
+
+
+def _generate_batched_summaries(
+    teams_data: List[Dict], batch_size: int, usage: AiUsage, advance: Callable[[int], None] = None
+) -> Dict[int, str]:
+    """
+    Summarize uncached teams `batch_size` at a time. Returns summaries by index into
+    `teams_data`; teams whose batch failed or didn't parse are absent.
+    `advance(n)` is called with the number of teams summarized as each batch completes.
+    """
+    api_key = os.getenv("OPENAI_API_KEY", "").strip().strip('"').strip("'")
+    if not api_key.startswith("sk-"):
+        # Leave key problems to the per-team path, which explains them in each row.
+        return {}
+
+    keys = [_summary_cache_key(team) for team in teams_data]
+    results = {}
+    pending = []
+    for idx, key in enumerate(keys):
+        cached_summary = SUMMARY_CACHE.get(key)
+        if cached_summary is not None:
+            results[idx] = cached_summary
+        else:
+            pending.append(idx)
+    if advance and results:
+        advance(len(results))
+    if not pending:
+        return results
+    client = _get_openai_client(api_key)
+
+    def run_batch(batch):
+        try:
+            summaries = _summarize_batch(client, [teams_data[idx] for idx in batch], usage)
+        except Exception as e:
+            print(f"Batched AI summary failed for {len(batch)} teams, falling back to per-team calls: {e}")
+            summaries = {}
+        if advance:
+            advance(sum(bool(summaries.get(str(teams_data[idx].get('Team_ID')))) for idx in batch))
+        return summaries
+
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    batch_results = concurrent_map(run_batch, batches, max_workers=AI_MAX_CONCURRENCY)
+    for batch, summaries in zip(batches, batch_results):
+        for idx in batch:
+            summary = summaries.get(str(teams_data[idx].get('Team_ID')))
+            if summary:
+                results[idx] = summary
+                SUMMARY_CACHE.put(keys[idx], summary)
+    return results
+
+
+def generate_ai_summaries(
+    teams_data: List[Dict], progress: ProgressCallback = None, batch_size: int = None
+) -> Dict[str, float]:
+    """
+    Fill in `AI_Summary` for every team, with up to AI_MAX_CONCURRENCY requests in flight.
+    With a batch size above 1, teams are packed into shared requests and any team that
+    doesn't come back parsed is summarized on its own. Progress is reported in teams
+    across both passes.
+    Returns the mode, request/token counts and wall time of the run.
+    """
+    batch_size = AI_BATCH_SIZE if batch_size is None else batch_size
+    usage = AiUsage()
+    start = time.perf_counter()
+
+    advance = None
+    if progress:
+        progress_lock = threading.Lock()
+        summarized = {"done": 0}
+
+        def advance(count):
+            with progress_lock:
+                summarized["done"] += count
+                progress("ai_summaries", summarized["done"], len(teams_data))
+
+        progress("ai_summaries", 0, len(teams_data))
+
+    summaries = {}
+    if batch_size > 1:
+        summaries = _generate_batched_summaries(teams_data, batch_size, usage, advance)
+
+    def summarize(team):
+        try:
+            print(f"Processing {team.get('Team', 'Unknown')}...")
+            return get_ai_defensive_summary(team, usage)
+        except Exception as e:
+            print(f"Error processing {team.get('Team', 'Unknown')}: {str(e)}")
+            return f"Error generating summary: {str(e)}"
+        finally:
+            if advance:
+                advance(1)
+
+    remaining = [idx for idx in range(len(teams_data)) if idx not in summaries]
+    remaining_summaries = concurrent_map(
+        lambda idx: summarize(teams_data[idx]), remaining, max_workers=AI_MAX_CONCURRENCY
+    )
+    summaries.update(zip(remaining, remaining_summaries))
+
+    for idx, team in enumerate(teams_data):
+        team['AI_Summary'] = summaries[idx]
+    SUMMARY_CACHE.save()
+
+    report = {
+        "mode": "batched" if batch_size > 1 else "per_team",
+        "batch_size": batch_size,
+        "fallback_teams": len(remaining) if batch_size > 1 else 0,
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        **usage.as_dict(),
+    }
+    print(
+        f"AI summaries ({report['mode']}): {report['requests']} requests, "
+        f"{report['total_tokens']} tokens, {report['wall_seconds']:.1f}s"
+    )
+    return report
+
+
+def _finish_run_report(status: str) -> Dict:
+    """
+    Close the run in METRICS and write its report (stage timings, per-endpoint request
+    stats, AI usage and connection reuse) to RUN_REPORT_PATH.
+    """
+    return METRICS.finish_run(
+        status,
+        extra={"connections": HTTP_SESSION.connection_stats(), "failed_units": len(FAILED_UNITS.pending())},
+        report_path=RUN_REPORT_PATH,
+    )
+
+
+def warm_imports() -> None:
+    """
+    Import the heavy dependencies up front. Used by gunicorn.conf.py so forked workers
+    inherit them from the master instead of importing them on their first run.
+    """
+    import ijson  # noqa: F401
+    import openai  # noqa: F401
+    import openpyxl  # noqa: F401
+    import requests  # noqa: F401
+
+
+def _copy_export(source: str, path: str) -> None:
+    """
+    Copy a snapshot export to `path`, replacing any previous file atomically.
+    """
+    tmp_path = f"{path}.tmp"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def fetch_and_save_nfl(progress: ProgressCallback = None, only_teams: Set[str] = None, keep_unchanged: bool = False):
+    """
+    Main function: Fetches the league's defensive stats from ESPN, generates AI summaries,
+    and saves everything to a new snapshot (see snapshots.py) and to an Excel file
+    (plus any other EXPORT_FORMATS) in the working directory. Returns the path of the
+    first of those files.
+    `progress(stage, done, total)` is called as each stage makes headway. `only_teams`
+    limits the season stat requests to those teams (see `fetch_nfl_defensive_stats`).
+    With `keep_unchanged`, rows equal to the current snapshot's are not published again.
+    """
+    METRICS.start_run()
     try:
-        print("Fetching NFL defensive stats from ESPN...")
-        teams_data = fetch_nfl_defensive_stats()
+        print(f"Fetching {LEAGUE.name} defensive stats from ESPN...")
+        teams_data = fetch_nfl_defensive_stats(progress, only_teams=only_teams)
         
         if not teams_data or len(teams_data) == 0:
             raise Exception("No team data retrieved from ESPN")
@@ -386,34 +1253,178 @@ def fetch_and_save_nfl():
                 team['AI_Summary'] = "AI summary not available - please set OPENAI_API_KEY in .env file"
         else:
             # Add AI summaries to each team
-            for idx, team in enumerate(teams_data):
-                try:
-                    print(f"Processing {team.get('Team', 'Unknown')} ({idx + 1}/{len(teams_data)})...")
-                    team['AI_Summary'] = get_ai_defensive_summary(team)
-                    # Small delay to avoid rate limiting
-                    time.sleep(0.5)
-                except Exception as e:
-                    print(f"Error processing {team.get('Team', 'Unknown')}: {str(e)}")
-                    team['AI_Summary'] = f"Error generating summary: {str(e)}"
+            with METRICS.stage("ai_summaries"):
+                generate_ai_summaries(teams_data, progress)
         
-        # Create DataFrame
-        df = pd.DataFrame(teams_data)
+        if progress:
+            progress("export", 0, 1)
+        with METRICS.stage("export"):
+            excel_filename = EXCEL_FILENAME
+            incomplete = sum(not row.get("Data_Complete", True) for row in teams_data)
+            previous = SNAPSHOTS.current()
+            if keep_unchanged and previous and json.loads(json.dumps(teams_data)) == SNAPSHOTS.rows(previous):
+                print(f"No changes since snapshot {previous['version']}; kept it.")
+                if progress:
+                    progress("export", 1, 1)
+                _finish_run_report("succeeded")
+                return export_path(excel_filename, EXPORT_FORMATS[0])
+            # Keep a better snapshot rather than replace it with one where every team has gaps.
+            if incomplete == len(teams_data) and previous and previous.get("incomplete_rows", 0) < incomplete:
+                raise RuntimeError("Every team is missing data from failed requests; kept the previous snapshot.")
+            snapshot = SNAPSHOTS.publish(teams_data, EXPORT_FORMATS, incomplete_rows=incomplete)
+            for fmt in EXPORT_FORMATS:
+                _copy_export(SNAPSHOTS.file(snapshot, fmt), export_path(excel_filename, fmt))
+        if progress:
+            progress("export", 1, 1)
         
-        # Save to Excel
-        excel_filename = "nfl_ai_summary.xlsx"
-        df.to_excel(excel_filename, index=False, engine='openpyxl')
-        
-        print(f"Saved to {excel_filename}")
-        return excel_filename
+        print(
+            f"Saved snapshot {snapshot['version']} and "
+            f"{', '.join(export_path(excel_filename, fmt) for fmt in EXPORT_FORMATS)}"
+        )
+        _finish_run_report("succeeded")
+        return export_path(excel_filename, EXPORT_FORMATS[0])
     
     except Exception as e:
         error_msg = f"Error in fetch_and_save_nflp: {str(e)}"
+        _finish_run_report("failed")
         print(error_msg)
         import traceback
         traceback.print_exc()
         raise Exception(error_msg)
 
 
+def _poll_live_weeks(calendar: GameCalendar, season: int, now: float) -> None:
+    """
+    Re-read the scoreboard weeks of the calendar's live games, past any cached copy.
+    """
+    for week in calendar.live_weeks(now):
+        payload = _make_request(
+            f"{SITE_API_BASE}/scoreboard",
+            params={"dates": season, "seasontype": REGULAR_SEASON, "week": week, **LEAGUE.scoreboard_params},
+            revalidate=True,
+        )
+        calendar.update(_index_events([payload]))
+
+
+def watch_games(once: bool = False) -> None:
+    """
+    Refresh daemon for the current regular season, run by `learningESPN.py watch`.
+    The schedule is read once and again every IDLE_POLL_SECONDS. While games are live
+    only their scoreboard weeks are polled (see game_calendar.py); between game
+    windows it sleeps until the next kickoff, making no requests. When games the
+    warehouse doesn't have yet are final, the pipeline runs with only their teams'
+    season stats re-fetched, and the summary cache means only teams whose numbers
+    changed are summarized again; a refresh that changes no row publishes nothing.
+    Queued failures are retried at each check until FAILED_UNITS gives up on them,
+    and a final game whose summary was given up on no longer starts one. The calendar and next check time are saved between
+    runs; with `once`, it checks if a check is due and returns.
+    """
+    season = _get_regular_season_year()
+    calendar, next_check = GameCalendar.load(season)
+    print(f"Watching the {LEAGUE.name} {season} regular season for finished games.")
+    while True:
+        now = time.time()
+        if now < next_check:
+            if once:
+                print(f"Nothing to do until {time.strftime('%Y-%m-%d %H:%M UTC', time.gmtime(next_check))}.")
+                return
+            time.sleep(next_check - now)
+            continue
+        try:
+            if calendar is None or now - calendar.read_at >= IDLE_POLL_SECONDS:
+                team_ids = [team.id for team in _get_team_list()] if EVENT_DISCOVERY == "schedule" else []
+                calendar = GameCalendar(_build_event_index(team_ids, season), read_at=now)
+            _poll_live_weeks(calendar, season, now)
+            ingested = WAREHOUSE.ingested_events(season, REGULAR_SEASON)
+            final = [
+                event_id for event_id in calendar.completed()
+                if event_id not in ingested and not FAILED_UNITS.given_up("summary", season, REGULAR_SEASON, event_id)
+            ]
+            queued = FAILED_UNITS.pending(season, REGULAR_SEASON, retrying=True)
+            if final or queued or SNAPSHOTS.current() is None:
+                affected = {team_id for event_id in final for team_id in calendar.events[event_id].teams}
+                print(f"{len(final)} newly final game(s), {len(queued)} queued request(s); refreshing.")
+                # The first run has no stored season stats to reuse, so it fetches every team's.
+                fetch_and_save_nfl(only_teams=affected if SNAPSHOTS.current() else None, keep_unchanged=True)
+        except Exception as exc:
+            print(f"Watch check failed, trying again at the next one: {exc}")
+
+        now = time.time()
+        # Without a calendar the schedule couldn't be read; try again soon rather than idle.
+        delay = calendar.next_poll(now) if calendar else LIVE_POLL_SECONDS
+        next_check = now + delay
+        if calendar:
+            calendar.save(season, next_check)
+        live = len(calendar.live(now)) if calendar else 0
+        kickoff = calendar.next_kickoff(now) if calendar else None
+        if calendar is None:
+            status = "schedule not read yet"
+        elif live:
+            status = f"{live} game(s) live"
+        elif kickoff:
+            status = f"next kickoff {time.strftime('%Y-%m-%d %H:%M UTC', time.gmtime(kickoff))}"
+        else:
+            status = "no games scheduled"
+        print(f"{status}; next check in {delay / 60:.0f} min.")
+        if once:
+            return
+
+
+def main(argv: List[str] = None) -> None:
+    """
+    Command line entry point. With no arguments, runs the pipeline for the current
+    season; `backfill` loads historical seasons into the warehouse, `failures`
+    lists the requests queued for retry and `watch` refreshes as games finish.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description=f"{LEAGUE.name} defensive stats and AI summaries from ESPN (ESPN_LEAGUE picks the league)."
+    )
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("run", help="fetch the current season, summarize it and write the exports (default)")
+    backfill = sub.add_parser("backfill", help="load historical seasons into the warehouse")
+    backfill.add_argument("seasons", type=parse_seasons, help='seasons to load, e.g. "2015-2024" or "2019,2021"')
+    backfill.add_argument("--no-postseason", dest="postseason", action="store_false", help="skip playoff games")
+    backfill.add_argument("--parallel", type=int, default=None, help="seasons loaded at once")
+    backfill.add_argument("--force", action="store_true", help="re-fetch seasons already marked complete")
+    failures = sub.add_parser("failures", help="list failed requests queued for the next run")
+    failures.add_argument("--season", type=int, default=None)
+    failures.add_argument("--retry", action="store_true", help="try requests that were given up on again")
+    watch = sub.add_parser("watch", help="refresh whenever games go final, polling only during game windows")
+    watch.add_argument("--once", action="store_true", help="check if one is due (e.g. from cron), then exit")
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill":
+        results = backfill_seasons(args.seasons, args.postseason, args.parallel, args.force)
+        failed = [result["season"] for result in results if "error" in result]
+        queued = FAILED_UNITS.pending()
+        if queued:
+            print(f"{len(queued)} request(s) failed and are queued; run the backfill again to retry them.")
+        if failed:
+            raise SystemExit(f"Backfill failed for seasons {failed}; run again to resume.")
+    elif args.command == "failures":
+        if args.retry:
+            FAILED_UNITS.retry_given_up(args.season)
+            FAILED_UNITS.save()
+        pending = FAILED_UNITS.pending(args.season)
+        for entry in sorted(pending, key=lambda entry: (entry["season"], entry["season_type"], entry["kind"])):
+            print(
+                f"{entry['season']} type {entry['season_type']} {entry['kind']} {entry['key']}: "
+                f"{entry['attempts']} attempt(s), last error: {entry['error']}"
+                f"{' (given up)' if entry['given_up'] else ''}"
+            )
+        given_up = sum(entry["given_up"] for entry in pending)
+        print(f"{len(pending) - given_up} unit(s) queued for the next run, {given_up} given up on (--retry to try again).")
+    elif args.command == "watch":
+        try:
+            watch_games(args.once)
+        except KeyboardInterrupt:
+            print("Stopped watching.")
+    else:
+        fetch_and_save_nfl()
+
+
 if __name__ == "__main__":
-    fetch_and_save_nfl()
+    main()
 
@@ -0,0 +1,284 @@
+# metrics.py
+"""
+Instrumentation for the fetch pipeline: ESPN request stats per endpoint, stage timings
+and OpenAI call stats.
+
+Everything is tallied twice: cumulatively for the process (rendered in Prometheus text
+format for /metrics) and for the run in progress (written out as a JSON run report
+when the run finishes).
+"""
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from season_state import atomic_write_json
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_ID_SEGMENT = re.compile(r"^\d+$")
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Collapse a request URL to a low-cardinality endpoint label, e.g.
+    .../teams/12/schedule -> "schedule", .../summary -> "summary".
+    """
+    segments = [segment for segment in urlparse(url).path.split("/") if segment and not _ID_SEGMENT.match(segment)]
+    return segments[-1] if segments else "root"
+
+
+class _EndpointStats:
+    __slots__ = ("requests", "cache_hits", "revalidated", "errors", "retries", "bytes", "seconds", "max_seconds")
+
+    def __init__(self):
+        self.requests = 0
+        self.cache_hits = 0
+        self.revalidated = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "revalidated": self.revalidated,
+            "network_fetches": self.requests - self.cache_hits - self.revalidated,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 3),
+            "avg_seconds": round(self.seconds / self.requests, 4) if self.requests else 0.0,
+            "max_seconds": round(self.max_seconds, 3),
+        }
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for idx, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[idx] += 1
+
+
+class _Tally:
+    """
+    Request, stage and AI counters for one scope (the process, or a single run).
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.endpoints: Dict[str, _EndpointStats] = {}
+        self.stages: Dict[str, List[float]] = {}  # name -> [count, total seconds, last seconds]
+        self.ai = {
+            "requests": 0,
+            "rate_limited": 0,
+            "errors": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "seconds": 0.0,
+        }
+
+    def endpoint(self, name: str) -> _EndpointStats:
+        stats = self.endpoints.get(name)
+        if stats is None:
+            stats = self.endpoints[name] = _EndpointStats()
+        return stats
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        entry = self.stages.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = seconds
+
+
+class Metrics:
+    """
+    Thread-safe registry of pipeline metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = _Tally()
+        self.request_latency: Dict[str, _Histogram] = {}
+        self.runs: Dict[str, int] = {}
+        self.last_run_finished_at: Optional[float] = None
+        self.last_report: Optional[Dict] = None
+        self._run: Optional[_Tally] = None
+
+    def _tallies(self) -> List[_Tally]:
+        return [self.total, self._run] if self._run is not None else [self.total]
+
+    def record_request(
+        self, url: str, seconds: float, bytes_received: int = 0, attempts: int = 1, cache: str = "miss", error: bool = False
+    ) -> None:
+        """
+        Record one `_make_request` call. `cache` is "hit" (served from cache without a
+        request), "revalidated" (304) or "miss".
+        """
+        name = endpoint_name(url)
+        with self._lock:
+            for tally in self._tallies():
+                stats = tally.endpoint(name)
+                stats.requests += 1
+                stats.cache_hits += cache == "hit"
+                stats.revalidated += cache == "revalidated"
+                stats.errors += error
+                stats.retries += max(0, attempts - 1)
+                stats.bytes += bytes_received
+                stats.seconds += seconds
+                stats.max_seconds = max(stats.max_seconds, seconds)
+            if cache != "hit":
+                self.request_latency.setdefault(name, _Histogram()).observe(seconds)
+
+    def record_ai_call(self, seconds: float, outcome: str = "ok", usage=None) -> None:
+        """
+        Record one chat completion attempt. `outcome` is "ok", "rate_limited" or "error".
+        """
+        with self._lock:
+            for tally in self._tallies():
+                tally.ai["requests"] += 1
+                tally.ai["seconds"] += seconds
+                if outcome == "rate_limited":
+                    tally.ai["rate_limited"] += 1
+                elif outcome != "ok":
+                    tally.ai["errors"] += 1
+                if usage is not None:
+                    tally.ai["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+                    tally.ai["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time a pipeline stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                for tally in self._tallies():
+                    tally.add_stage(name, seconds)
+
+    def start_run(self) -> None:
+        with self._lock:
+            self._run = _Tally()
+
+    def finish_run(self, status: str, extra: Dict = None, report_path: str = None) -> Dict:
+        """
+        Close the current run, count it under `status` and build its report. The report
+        is also written to `report_path` when given.
+        """
+        with self._lock:
+            run = self._run or _Tally()
+            self._run = None
+            finished_at = time.time()
+            self.runs[status] = self.runs.get(status, 0) + 1
+            self.last_run_finished_at = finished_at
+            report = {
+                "status": status,
+                "started_at": run.started_at,
+                "finished_at": finished_at,
+                "wall_seconds": round(finished_at - run.started_at, 3),
+                "stages": {name: round(entry[1], 3) for name, entry in run.stages.items()},
+                "requests": {name: stats.as_dict() for name, stats in sorted(run.endpoints.items())},
+                "ai": {key: round(value, 3) if isinstance(value, float) else value for key, value in run.ai.items()},
+            }
+            if extra:
+                report.update(extra)
+            self.last_report = report
+
+        if report_path:
+            atomic_write_json(report_path, report, indent=2)
+        return report
+
+    def render_prometheus(self, extra_gauges: Dict[str, float] = None) -> str:
+        """
+        Render cumulative metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        with self._lock:
+            endpoints = sorted(self.total.endpoints.items())
+            metric(
+                "espn_requests_total", "counter", "ESPN requests by endpoint and cache outcome.",
+                [
+                    ({"endpoint": name, "cache": cache}, count)
+                    for name, stats in endpoints
+                    for cache, count in (
+                        ("hit", stats.cache_hits),
+                        ("revalidated", stats.revalidated),
+                        ("miss", stats.requests - stats.cache_hits - stats.revalidated),
+                    )
+                ],
+            )
+            metric("espn_request_errors_total", "counter", "ESPN requests that failed after retries.",
+                   [({"endpoint": name}, stats.errors) for name, stats in endpoints])
+            metric("espn_request_retries_total", "counter", "ESPN request retry attempts.",
+                   [({"endpoint": name}, stats.retries) for name, stats in endpoints])
+            metric("espn_response_bytes_total", "counter", "Bytes received from ESPN.",
+                   [({"endpoint": name}, stats.bytes) for name, stats in endpoints])
+
+            lines.append("# HELP espn_request_duration_seconds Latency of ESPN requests that hit the network.")
+            lines.append("# TYPE espn_request_duration_seconds histogram")
+            for name, histogram in sorted(self.request_latency.items()):
+                for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                    lines.append(f'espn_request_duration_seconds_bucket{{endpoint="{name}",le="{bound}"}} {count}')
+                lines.append(f'espn_request_duration_seconds_bucket{{endpoint="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'espn_request_duration_seconds_sum{{endpoint="{name}"}} {histogram.sum:.6f}')
+                lines.append(f'espn_request_duration_seconds_count{{endpoint="{name}"}} {histogram.count}')
+
+            stages = sorted(self.total.stages.items())
+            lines.append("# HELP pipeline_stage_duration_seconds Time spent in each pipeline stage.")
+            lines.append("# TYPE pipeline_stage_duration_seconds summary")
+            for name, (count, total, _) in stages:
+                lines.append(f'pipeline_stage_duration_seconds_sum{{stage="{name}"}} {total:.6f}')
+                lines.append(f'pipeline_stage_duration_seconds_count{{stage="{name}"}} {count}')
+            metric("pipeline_stage_last_duration_seconds", "gauge", "Duration of the most recent run of each stage.",
+                   [({"stage": name}, f"{last:.6f}") for name, (_, _, last) in stages])
+
+            metric("pipeline_runs_total", "counter", "Completed pipeline runs by status.",
+                   [({"status": status}, count) for status, count in sorted(self.runs.items())])
+            if self.last_run_finished_at is not None:
+                metric("pipeline_last_run_finished_timestamp_seconds", "gauge", "When the last pipeline run finished.",
+                       [({}, f"{self.last_run_finished_at:.3f}")])
+
+            ai = self.total.ai
+            metric("openai_requests_total", "counter", "Chat completion attempts by outcome.", [
+                ({"outcome": "ok"}, ai["requests"] - ai["rate_limited"] - ai["errors"]),
+                ({"outcome": "rate_limited"}, ai["rate_limited"]),
+                ({"outcome": "error"}, ai["errors"]),
+            ])
+            metric("openai_request_duration_seconds_total", "counter", "Time spent waiting on chat completions.",
+                   [({}, f"{ai['seconds']:.6f}")])
+            metric("openai_tokens_total", "counter", "Tokens used by chat completions.", [
+                ({"type": "prompt"}, ai["prompt_tokens"]),
+                ({"type": "completion"}, ai["completion_tokens"]),
+            ])
+
+        for name, value in sorted((extra_gauges or {}).items()):
+            metric(name, "gauge", name.replace("_", " ").capitalize() + ".", [({}, value)])
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
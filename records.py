@@ -0,0 +1,88 @@
+# records.py
+"""
+Compact record types for what the pipeline keeps in memory per team, event and game.
+
+Records are NamedTuples rather than dicts, so each one costs a single tuple instead
+of a hash table. Team and event ids are interned as they are read, so the thousands
+of rows that refer to the same team share one string. Rows become dicts only where
+they leave the pipeline (JSON responses, exports and the failure queue).
+"""
+import sys
+from typing import Dict, NamedTuple, Optional, Tuple
+
+
+def intern_id(value) -> Optional[str]:
+    """
+    `value` as an interned string, so equal ids share one object. None stays None.
+    """
+    return None if value is None else sys.intern(str(value))
+
+
+class Team(NamedTuple):
+    id: str
+    name: str
+    abbreviation: str
+
+
+class Event(NamedTuple):
+    """
+    One scheduled game: its team ids, whether it is final, its week and date, and the
+    score of each team in `teams` order.
+    """
+
+    teams: Tuple[str, ...]
+    completed: bool
+    week: Optional[int]
+    date: Optional[str]
+    scores: Tuple[Optional[int], ...]
+
+    def score(self, team_id: str) -> Optional[int]:
+        """
+        `team_id`'s score, or None if it is not known.
+        """
+        for tid, score in zip(self.teams, self.scores):
+            if tid == team_id:
+                return score
+        return None
+
+    def to_context(self) -> Dict:
+        """
+        The event as a JSON-safe dict, as stored with queued failures.
+        """
+        return {
+            "teams": list(self.teams),
+            "completed": self.completed,
+            "week": self.week,
+            "date": self.date,
+            "scores": dict(zip(self.teams, self.scores)),
+        }
+
+    @classmethod
+    def from_context(cls, context: Dict) -> "Event":
+        teams = tuple(intern_id(team_id) for team_id in context.get("teams", []))
+        scores = context.get("scores") or {}
+        return cls(
+            teams, bool(context.get("completed")), context.get("week"), context.get("date"),
+            tuple(scores.get(team_id) for team_id in teams),
+        )
+
+
+class TeamGame(NamedTuple):
+    """
+    What one team's defense allowed in one game: a row of the warehouse's team_games
+    table, with fields in its column order.
+    """
+
+    event_id: str
+    team_id: str
+    opponent_id: str
+    season: int
+    season_type: int
+    week: Optional[int]
+    points_allowed: Optional[int] = None
+    yards_allowed: Optional[int] = None
+    passing_yards_allowed: Optional[int] = None
+    rushing_yards_allowed: Optional[int] = None
+    takeaways: Optional[int] = None
+    sacks: Optional[int] = None
+    interceptions: Optional[int] = None
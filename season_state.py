@@ -0,0 +1,202 @@
+# season_state.py
+"""
+Persisted pipeline state: the state directory shared with the warehouse and run
+report, a cache of AI summaries keyed by their prompt, and the queue of failed
+units retried on the next run.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from espn_http import env_bool, env_int
+from leagues import LEAGUE
+
+STATE_DIR = os.getenv("ESPN_STATE_DIR", ".espn_state")
+# Leagues other than the NFL keep their warehouse, queues and snapshots in a subdirectory.
+if LEAGUE.key != "nfl":
+    STATE_DIR = os.path.join(STATE_DIR, LEAGUE.key)
+# With ESPN_INCREMENTAL=0, games already in the warehouse are fetched again on every run.
+INCREMENTAL = env_bool("ESPN_INCREMENTAL", True)
+# Runs a failed unit is tried in before the queue gives up on it.
+FAILED_UNIT_ATTEMPTS = env_int("ESPN_FAILED_UNIT_ATTEMPTS", 5)
+
+
+def atomic_write_json(path: str, data: Dict, indent: int = None) -> None:
+    """
+    Write `data` as JSON to `path` through a temporary file and a rename, so readers
+    never see a partly written file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp_path, path)
+
+
+class SummaryCache:
+    """
+    AI summaries keyed by a hash of everything sent to the model, so teams whose stats
+    haven't changed are not re-summarized. Entries are kept in memory and written out
+    with `save()`.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 1000):
+        self.path = path or os.path.join(STATE_DIR, "ai_summaries.json")
+        self.max_entries = max_entries
+        self._entries: Dict[str, str] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, str]:
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path) as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError) as exc:
+                    print(f"Ignoring unreadable summary cache {self.path}: {exc}")
+        return self._entries
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key: str, summary: str) -> None:
+        with self._lock:
+            entries = self._load()
+            entries.pop(key, None)
+            entries[key] = summary
+            # Oldest entries come first; drop them once over the limit.
+            while len(entries) > self.max_entries:
+                del entries[next(iter(entries))]
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            atomic_write_json(self.path, self._entries)
+            self._dirty = False
+
+
+class FailureQueue:
+    """
+    Dead-letter queue of pipeline units (a scoreboard week, a team schedule, a game
+    summary, a team's season statistics or record) that failed, so a run can carry on
+    without them and the next run retries them. Entries are keyed by kind, season,
+    season type and unit key, and written out with `save()`. A unit that failed
+    FAILED_UNIT_ATTEMPTS times, or with an error that retrying can't fix (such as a
+    404), is given up on: it stays queued, so its data is still reported missing, but
+    isn't requested again until `retry_given_up` is called.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(STATE_DIR, "failed_units.json")
+        self._entries: Dict[str, Dict] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path) as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError) as exc:
+                    print(f"Ignoring unreadable failure queue {self.path}: {exc}")
+        return self._entries
+
+    @staticmethod
+    def _id(kind: str, season: int, season_type: int, key: str) -> str:
+        return f"{kind}:{season}:{season_type}:{key}"
+
+    @staticmethod
+    def _given_up(entry: Dict) -> bool:
+        return not entry.get("retryable", True) or entry["attempts"] >= FAILED_UNIT_ATTEMPTS
+
+    def record(
+        self, kind: str, season: int, season_type: int, key: str, error: str, context: Dict = None,
+        retryable: bool = True,
+    ) -> None:
+        """
+        Add a failed unit, or count another attempt of one already queued. `context`
+        holds whatever is needed to retry it without rediscovering it. `retryable` is
+        False for errors that will recur, which gives up on the unit at once.
+        """
+        now = time.time()
+        with self._lock:
+            entries = self._load()
+            entry_id = self._id(kind, season, season_type, key)
+            entry = entries.get(entry_id) or {
+                "kind": kind, "season": season, "season_type": season_type, "key": str(key),
+                "attempts": 0, "first_failed_at": now,
+            }
+            entry.update(error=error, attempts=entry["attempts"] + 1, last_failed_at=now, retryable=retryable)
+            if context is not None:
+                entry["context"] = context
+            entries[entry_id] = entry
+            self._dirty = True
+
+    def resolve(self, kind: str, season: int, season_type: int, key: str) -> None:
+        with self._lock:
+            if self._load().pop(self._id(kind, season, season_type, key), None) is not None:
+                self._dirty = True
+
+    def given_up(self, kind: str, season: int, season_type: int, key: str) -> bool:
+        with self._lock:
+            entry = self._load().get(self._id(kind, season, season_type, key))
+            return entry is not None and self._given_up(entry)
+
+    def pending(
+        self, season: int = None, season_type: int = None, kinds: Iterable[str] = None, retrying: bool = False
+    ) -> List[Dict]:
+        """
+        Queued units, optionally limited to one season, season type and some kinds, and
+        with `retrying`, to those not given up on.
+        """
+        kinds = set(kinds) if kinds is not None else None
+        with self._lock:
+            return [
+                dict(entry, given_up=self._given_up(entry)) for entry in self._load().values()
+                if (season is None or entry["season"] == season)
+                and (season_type is None or entry["season_type"] == season_type)
+                and (kinds is None or entry["kind"] in kinds)
+                and not (retrying and self._given_up(entry))
+            ]
+
+    def retry_given_up(self, season: int = None) -> int:
+        """
+        Try the units given up on (optionally of one season) again on the next run.
+        Returns how many there were.
+        """
+        with self._lock:
+            entries = [
+                entry for entry in self._load().values()
+                if (season is None or entry["season"] == season) and self._given_up(entry)
+            ]
+            for entry in entries:
+                entry.update(attempts=0, retryable=True)
+            self._dirty = self._dirty or bool(entries)
+        return len(entries)
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            atomic_write_json(self.path, self._entries)
+            self._dirty = False
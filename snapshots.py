@@ -0,0 +1,155 @@
+# snapshots.py
+"""
+Versioned snapshots of pipeline output, so the web app can always serve the last
+good results while a refresh runs.
+
+Each successful run writes its exports into a new directory under the snapshot
+directory, named by creation time, then points the `CURRENT` file at it with an
+atomic rename. Readers resolve `CURRENT` on every request and never see a
+half-written snapshot; a failed run leaves the previous one in place. Old
+snapshots are pruned by count and age, and the current one is always kept.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+from espn_http import env_float, env_int
+from export import export_path, read_json_rows, write_rows
+from leagues import LEAGUE
+from season_state import STATE_DIR, atomic_write_json
+
+# Snapshots kept (newest first), and the age in days past which they are removed.
+SNAPSHOT_KEEP = env_int("ESPN_SNAPSHOT_KEEP", 10)
+SNAPSHOT_MAX_AGE_DAYS = env_float("ESPN_SNAPSHOT_MAX_AGE_DAYS", 30.0)
+SNAPSHOT_BASENAME = f"{LEAGUE.key}_ai_summary"
+
+
+class SnapshotStore:
+    """
+    Snapshot directories under `directory`, each holding the run's exports and a
+    meta.json. Every snapshot has a JSON export, which `/data` reads and other
+    formats are converted from on demand.
+    """
+
+    def __init__(self, directory: str, keep: int = SNAPSHOT_KEEP, max_age_days: float = SNAPSHOT_MAX_AGE_DAYS):
+        self.directory = directory
+        self.keep = max(1, keep)
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self._convert_lock = threading.Lock()
+        self._rows_cache: Dict[str, List[Dict]] = {}
+
+    @property
+    def _pointer(self) -> str:
+        return os.path.join(self.directory, "CURRENT")
+
+    def _path(self, version: str, fmt: str) -> str:
+        return export_path(os.path.join(self.directory, version, SNAPSHOT_BASENAME), fmt)
+
+    def publish(self, rows: List[Dict], formats: Iterable[str], **meta) -> Dict:
+        """
+        Write `rows` in each of `formats` (plus JSON) to a new snapshot, make it current
+        and prune old ones. Extra keyword arguments are stored in its metadata.
+        """
+        created_at = time.time()
+        version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(created_at)) + f"-{uuid.uuid4().hex[:6]}"
+        formats = list(dict.fromkeys(["json", *formats]))
+        tmp_dir = os.path.join(self.directory, f".{version}.tmp")
+        os.makedirs(tmp_dir)
+        try:
+            for fmt in formats:
+                write_rows(rows, export_path(os.path.join(tmp_dir, SNAPSHOT_BASENAME), fmt), fmt)
+            info = dict(meta, version=version, created_at=created_at, rows=len(rows), formats=formats)
+            atomic_write_json(os.path.join(tmp_dir, "meta.json"), info)
+            os.rename(tmp_dir, os.path.join(self.directory, version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        with self._lock:
+            atomic_write_json(self._pointer, {"version": version})
+            self._prune(version)
+        return info
+
+    def current(self) -> Optional[Dict]:
+        """
+        Metadata of the current snapshot, or None before the first publish.
+        """
+        try:
+            with open(self._pointer) as f:
+                version = json.load(f)["version"]
+            with open(os.path.join(self.directory, version, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def age_seconds(self) -> Optional[float]:
+        """
+        Seconds since the current snapshot was published, or None if there is none.
+        """
+        snapshot = self.current()
+        return None if snapshot is None else time.time() - snapshot["created_at"]
+
+    def file(self, snapshot: Dict, fmt: str) -> str:
+        """
+        Path of `snapshot`'s export in `fmt`, converted from its JSON export the first
+        time a format the run didn't write is asked for.
+        """
+        path = self._path(snapshot["version"], fmt)
+        with self._convert_lock:
+            if not os.path.exists(path):
+                write_rows(self.rows(snapshot), path, fmt)
+        return path
+
+    def rows(self, snapshot: Dict) -> List[Dict]:
+        """
+        `snapshot`'s rows, read from its JSON export once per process.
+        """
+        version = snapshot["version"]
+        with self._lock:
+            rows = self._rows_cache.get(version)
+        if rows is None:
+            rows = read_json_rows(self._path(version, "json"))
+            with self._lock:
+                # Snapshots never change, so only the newest one needs to stay cached.
+                self._rows_cache = {version: rows}
+        return rows
+
+    def list(self) -> List[Dict]:
+        """
+        Metadata of every stored snapshot, newest first.
+        """
+        snapshots = []
+        for version in self._versions():
+            try:
+                with open(os.path.join(self.directory, version, "meta.json")) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(snapshots, key=lambda snapshot: snapshot["created_at"], reverse=True)
+
+    def _versions(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            name for name in os.listdir(self.directory)
+            if not name.startswith(".") and os.path.isdir(os.path.join(self.directory, name))
+        ]
+
+    def _prune(self, current: str) -> None:
+        now = time.time()
+        cutoff = now - self.max_age_days * 86400
+        for idx, snapshot in enumerate(self.list()):
+            if snapshot["version"] != current and (idx >= self.keep or snapshot["created_at"] < cutoff):
+                shutil.rmtree(os.path.join(self.directory, snapshot["version"]), ignore_errors=True)
+        # Unfinished snapshots left by a run that crashed while writing.
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp") and os.path.isdir(path) and os.path.getmtime(path) < now - 86400:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+SNAPSHOTS = SnapshotStore(os.getenv("ESPN_SNAPSHOT_DIR", os.path.join(STATE_DIR, "snapshots")))
@@ -0,0 +1,123 @@
+# stat_index.py
+"""
+Flat lookup of ESPN season statistics and record payloads.
+
+Both payloads nest stats inside groups (statistics: `splits.categories[].stats[]`,
+record: `items[].stats[]`). `index_stats` wraps a payload in a `StatIndex`, which
+indexes each group into a dict keyed by stat name the first time it is read, and
+`select_stats` reads a whole schema of columns from it, parsing each value (with the
+displayValue fallback) once. The group "*" matches the first group that has the stat.
+
+The index is for wide schemas (ESPN_STAT_SCHEMA). Reading one stat costs a scan of
+half a group on average, while indexing costs a full pass, so the index wins once a
+schema reads many stats per group. On synthetic payloads shaped like ESPN's
+(benchmarks/bench_stat_lookup.py, about ten groups of 30-50 stats), 64 stats read
+1.3x faster than one scan per stat and 128-256 stats 2-3x faster. The default
+schema's four stats read about half as fast, some 25 microseconds more per team.
+ESPN_TEAM_STATS=boxscores, the default, doesn't fetch these payloads at all.
+
+A stat schema maps output columns to `(source, group, stat)`, where source is
+"statistics" or "record". It can be extended with a JSON file of the same shape:
+
+    {"Passes_Defended": ["statistics", "defensive", "passesDefended"]}
+"""
+import json
+from typing import Dict, Iterable, Optional, Tuple
+
+ANY_GROUP = "*"
+SOURCES = ("statistics", "record")
+
+StatSchema = Dict[str, Tuple[str, str, str]]
+
+
+def _stat_value(stat: Dict) -> Optional[float]:
+    """
+    A stat's numeric value, falling back to its displayValue ("1,234") when the value
+    isn't numeric. None when the stat has no value.
+    """
+    value = stat.get("value")
+    if value in (None, "", "null"):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        try:
+            return float(str(stat.get("displayValue")).replace(",", ""))
+        except (TypeError, ValueError):
+            return None
+
+
+class StatIndex:
+    """
+    Stats of one statistics or record payload, looked up by (group, stat name). Each
+    group is indexed into a dict the first time it is read, which costs about one scan
+    of the group and makes every later lookup in it a dict lookup.
+    """
+
+    def __init__(self, payload: Dict):
+        if "splits" in payload:
+            self._groups, self._group_key = payload["splits"].get("categories", []), "name"
+        else:
+            # Record items are named by type, falling back to name.
+            self._groups, self._group_key = payload.get("items", []), "type"
+        self._indexed: Dict[str, Dict[str, Dict]] = {}
+
+    def get(self, group: str, name: str) -> Optional[Dict]:
+        """
+        The stat entry `name` in `group` (ANY_GROUP: the first group that has it).
+        """
+        indexed = self._indexed.get(group)
+        if indexed is None:
+            indexed = {}
+            for entry in reversed(self._groups):
+                if group == ANY_GROUP or (entry.get(self._group_key) or entry.get("name")) == group:
+                    # Filled last to first, so the first stat with a name is kept, as with a scan.
+                    indexed.update({stat["name"]: stat for stat in reversed(entry.get("stats", [])) if "name" in stat})
+            self._indexed[group] = indexed
+        return indexed.get(name)
+
+
+def index_stats(payload: Dict) -> StatIndex:
+    """
+    Index a statistics or record payload for `select_stats`.
+    """
+    return StatIndex(payload)
+
+
+def select_stats(indexes: Dict[str, StatIndex], schema: StatSchema, default: float = 0.0) -> Dict[str, float]:
+    """
+    Read every column of `schema` from indexed payloads keyed by source, parsing each
+    value once. Missing stats and sources get `default`.
+    """
+    selected = {}
+    for column, (source, group, name) in schema.items():
+        index = indexes.get(source)
+        stat = index.get(group, name) if index is not None else None
+        value = None if stat is None else _stat_value(stat)
+        selected[column] = default if value is None else value
+    return selected
+
+
+def schema_sources(schema: StatSchema, columns: Iterable[str] = None) -> Tuple[str, ...]:
+    """
+    The payload sources needed to fill `columns` (default: all) of `schema`.
+    """
+    columns = schema if columns is None else columns
+    return tuple(source for source in SOURCES if any(schema[column][0] == source for column in columns))
+
+
+def load_stat_schema(defaults: StatSchema, path: str = None) -> StatSchema:
+    """
+    `defaults` extended (or overridden) by the columns in the JSON file at `path`.
+    """
+    schema = dict(defaults)
+    if not path:
+        return schema
+    with open(path) as f:
+        extra = json.load(f)
+    for column, entry in extra.items():
+        source, group, name = entry
+        if source not in SOURCES:
+            raise ValueError(f"Stat schema column {column!r}: source must be one of {', '.join(SOURCES)}")
+        schema[column] = (source, group, name)
+    return schema
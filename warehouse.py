@@ -0,0 +1,285 @@
+# warehouse.py
+"""
+Local SQLite store of per-game, per-team defensive rows across seasons.
+
+Each ingested game keeps its trimmed boxscore alongside one row per team with what
+that team's defense allowed (game_metrics.py builds its matrix from the boxscores).
+Season totals are stored per team and season (with any extra stat-schema columns as
+JSON), and checkpoints record which season types are fully ingested, so a
+backfill can stop and resume and finished seasons are never crawled again.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from leagues import POSTSEASON, REGULAR_SEASON
+from records import TeamGame
+from season_state import STATE_DIR
+
+# Per-game stat columns of team_games (the stat fields of records.TeamGame).
+GAME_STAT_COLUMNS = (
+    "points_allowed",
+    "yards_allowed",
+    "passing_yards_allowed",
+    "rushing_yards_allowed",
+    "takeaways",
+    "sacks",
+    "interceptions",
+)
+TEAM_SEASON_COLUMNS = ("points_allowed", "yards_allowed", "turnovers", "sacks", "interceptions")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS games (
+    event_id TEXT PRIMARY KEY,
+    season INTEGER NOT NULL,
+    season_type INTEGER NOT NULL,
+    week INTEGER,
+    date TEXT,
+    boxscore BLOB,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_season ON games (season, season_type);
+CREATE TABLE IF NOT EXISTS team_games (
+    event_id TEXT NOT NULL,
+    team_id TEXT NOT NULL,
+    opponent_id TEXT NOT NULL,
+    season INTEGER NOT NULL,
+    season_type INTEGER NOT NULL,
+    week INTEGER,
+    {", ".join(f"{name} INTEGER" for name in GAME_STAT_COLUMNS)},
+    PRIMARY KEY (event_id, team_id)
+);
+CREATE INDEX IF NOT EXISTS team_games_season_week_team ON team_games (season, season_type, week, team_id);
+CREATE INDEX IF NOT EXISTS team_games_team ON team_games (team_id, season);
+CREATE TABLE IF NOT EXISTS team_seasons (
+    season INTEGER NOT NULL,
+    team_id TEXT NOT NULL,
+    name TEXT,
+    abbreviation TEXT,
+    {", ".join(f"{name} INTEGER" for name in TEAM_SEASON_COLUMNS)},
+    extra TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (season, team_id)
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    season INTEGER NOT NULL,
+    season_type INTEGER NOT NULL,
+    events INTEGER NOT NULL,
+    ingested INTEGER NOT NULL,
+    complete INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (season, season_type)
+);
+"""
+
+
+def parse_seasons(text: str) -> List[int]:
+    """
+    Parse "2015-2024", "2019,2021" or a mix of both into a sorted list of seasons.
+    """
+    seasons = set()
+    for part in text.split(","):
+        first, _, last = part.strip().partition("-")
+        seasons.update(range(int(first), int(last or first) + 1))
+    return sorted(seasons)
+
+
+class StatsWarehouse:
+    """
+    Thread-safe access to the warehouse database. The connection is opened on first
+    use, in WAL mode so the web app can read while a backfill is writing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            # Stores created before team_seasons.extra existed.
+            if "extra" not in {row["name"] for row in self._conn.execute("PRAGMA table_info(team_seasons)")}:
+                self._conn.execute("ALTER TABLE team_seasons ADD COLUMN extra TEXT")
+            self._conn.commit()
+        return self._conn
+
+    def _query(self, sql: str, params: Iterable = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._connect().execute(sql, tuple(params)).fetchall()
+
+    def ingested_events(self, season: int, season_type: int = REGULAR_SEASON) -> Set[str]:
+        rows = self._query("SELECT event_id FROM games WHERE season = ? AND season_type = ?", (season, season_type))
+        return {row["event_id"] for row in rows}
+
+    def put_games(self, games: List[Dict], team_rows: List[TeamGame]) -> None:
+        """
+        Insert or replace games and their per-team rows in one transaction. Each game
+        dict carries event_id, season, season_type, week, date and its boxscore teams.
+        """
+        now = time.time()
+        columns = TeamGame._fields
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO games (event_id, season, season_type, week, date, boxscore, ingested_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            game["event_id"], game["season"], game["season_type"], game.get("week"), game.get("date"),
+                            zlib.compress(json.dumps(game.get("boxscore", [])).encode("utf-8")), now,
+                        )
+                        for game in games
+                    ],
+                )
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO team_games ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' for _ in columns)})",
+                    team_rows,
+                )
+
+    def boxscores(self, season: int, season_type: int = REGULAR_SEASON) -> Iterator[Dict]:
+        """
+        Stored boxscore teams of every game in one season type, in week order. The
+        compressed boxscores are read at once and each is only inflated as it is
+        iterated, so a season's parsed boxscores are never all in memory.
+        """
+        rows = self._query(
+            "SELECT event_id, week, boxscore FROM games WHERE season = ? AND season_type = ? ORDER BY week, event_id",
+            (season, season_type),
+        )
+        for row in rows:
+            yield {"event_id": row["event_id"], "week": row["week"], "teams": json.loads(zlib.decompress(row["boxscore"]))}
+
+    def points_allowed(self, season: int, season_type: int = REGULAR_SEASON) -> Dict[Tuple[str, str], Optional[int]]:
+        """
+        Points each team allowed in each game of one season type, keyed by (event id, team id).
+        """
+        rows = self._query(
+            "SELECT event_id, team_id, points_allowed FROM team_games WHERE season = ? AND season_type = ?",
+            (season, season_type),
+        )
+        return {(event_id, team_id): points for event_id, team_id, points in rows}
+
+    def put_team_seasons(self, season: int, rows: List[Dict], extra_columns: Iterable[str] = ()) -> None:
+        """
+        Store season totals for each team, in the row shape fetch_nfl_defensive_stats returns.
+        `extra_columns` of each row (configured stat schema columns) are kept as JSON.
+        """
+        extra_columns = list(extra_columns)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO team_seasons (season, team_id, name, abbreviation, "
+                    f"{', '.join(TEAM_SEASON_COLUMNS)}, extra, updated_at) VALUES ({', '.join('?' * 11)})",
+                    [
+                        (
+                            season, row["Team_ID"], row["Team"], row["Abbreviation"], row["Points_Allowed"],
+                            row["Yards_Allowed"], row["Turnovers"], row["Sacks"], row["Interceptions"],
+                            json.dumps({column: row[column] for column in extra_columns if column in row}), now,
+                        )
+                        for row in rows
+                    ],
+                )
+
+    def team_seasons(self, season: int) -> List[Dict]:
+        """
+        Stored season totals for `season` in the row shape fetch_nfl_defensive_stats returns.
+        """
+        rows = self._query(
+            "SELECT * FROM team_seasons WHERE season = ? ORDER BY CAST(team_id AS INTEGER), team_id", (season,)
+        )
+        return [
+            {
+                "Team": row["name"],
+                "Abbreviation": row["abbreviation"],
+                "Team_ID": row["team_id"],
+                "Points_Allowed": row["points_allowed"],
+                "Yards_Allowed": row["yards_allowed"],
+                "Turnovers": row["turnovers"],
+                "Sacks": row["sacks"],
+                "Interceptions": row["interceptions"],
+                **json.loads(row["extra"] or "{}"),
+            }
+            for row in rows
+        ]
+
+    def checkpoint(self, season: int, season_type: int = REGULAR_SEASON) -> Optional[Dict]:
+        rows = self._query(
+            "SELECT * FROM checkpoints WHERE season = ? AND season_type = ?", (season, season_type)
+        )
+        return dict(rows[0]) if rows else None
+
+    def set_checkpoint(self, season: int, season_type: int, events: int, ingested: int, complete: bool) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints (season, season_type, events, ingested, complete, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (season, season_type, events, ingested, int(complete), time.time()),
+                )
+
+    def is_complete(self, season: int, season_type: int = REGULAR_SEASON) -> bool:
+        checkpoint = self.checkpoint(season, season_type)
+        return bool(checkpoint and checkpoint["complete"])
+
+    def seasons(self) -> List[Dict]:
+        """
+        Checkpoint state of every season type in the store.
+        """
+        return [dict(row) for row in self._query("SELECT * FROM checkpoints ORDER BY season, season_type")]
+
+    def history(self, seasons: Iterable[int] = None, team: str = None) -> List[Dict]:
+        """
+        Stored season totals across seasons, optionally limited to some seasons and to
+        one team (by id or abbreviation).
+        """
+        sql = "SELECT * FROM team_seasons WHERE 1 = 1"
+        params: List = []
+        seasons = list(seasons or [])
+        if seasons:
+            sql += f" AND season IN ({', '.join('?' for _ in seasons)})"
+            params.extend(seasons)
+        if team:
+            sql += " AND (team_id = ? OR UPPER(abbreviation) = UPPER(?))"
+            params.extend([team, team])
+        sql += " ORDER BY season, CAST(team_id AS INTEGER)"
+        return [
+            {key: row[key] for key in ("season", "team_id", "name", "abbreviation") + TEAM_SEASON_COLUMNS}
+            for row in self._query(sql, params)
+        ]
+
+    def games(self, season: int, team: str = None, week: int = None, season_type: int = None) -> List[Dict]:
+        """
+        Per-game rows for a season, optionally filtered by team id, week and season type.
+        """
+        sql = "SELECT * FROM team_games WHERE season = ?"
+        params: List = [season]
+        if team:
+            sql += " AND team_id = ?"
+            params.append(team)
+        if week is not None:
+            sql += " AND week = ?"
+            params.append(week)
+        if season_type is not None:
+            sql += " AND season_type = ?"
+            params.append(season_type)
+        sql += " ORDER BY season_type, week, event_id, team_id"
+        return [dict(row) for row in self._query(sql, params)]
+
+
+WAREHOUSE = StatsWarehouse(os.getenv("ESPN_WAREHOUSE", os.path.join(STATE_DIR, "warehouse.sqlite")))